@@ -0,0 +1,98 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ApiTests(TestCase):
+    """Класс тестирования JSON API"""
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='test-slug', description='Описание')
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, group=cls.group, text=f'Пост {i}')
+            for i in range(5)
+        ]
+        cls.comment = Comment.objects.create(
+            post=cls.posts[0], author=cls.reader, text='Комментарий')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def get_json(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('serialize;dur=', response['Server-Timing'])
+        return json.loads(response.content)
+
+    def test_endpoints(self):
+        """Ленты и комментарии отдаются списком записей"""
+        urls = {
+            reverse('api:posts'): 5,
+            reverse('api:group_posts', args=[self.group.slug]): 5,
+            reverse('api:profile_posts', args=[self.author.username]): 5,
+            reverse('api:post_comments', args=[self.posts[0].id]): 1,
+        }
+        for url, total in urls.items():
+            with self.subTest(url=url):
+                self.assertEqual(len(self.get_json(url)['results']), total)
+        item = self.get_json(reverse('api:posts'))['results'][0]
+        self.assertEqual(item['text'], self.posts[-1].text)
+        self.assertEqual(item['author'], self.author.username)
+        self.assertEqual(item['group'], self.group.slug)
+        self.assertIsNone(item['image'])
+
+    def test_cursor_pagination(self):
+        """Курсоры проходят ленту без пропусков и повторов"""
+        url = reverse('api:posts')
+        data = self.get_json(url, limit=2)
+        seen = [item['id'] for item in data['results']]
+        self.assertIsNone(data['previous'])
+        while data['next']:
+            data = self.get_json(url, limit=2, after=data['next'])
+            seen += [item['id'] for item in data['results']]
+        self.assertEqual(seen, [post.id for post in reversed(self.posts)])
+        data = self.get_json(url, limit=2, before=data['previous'])
+        self.assertEqual([item['id'] for item in data['results']], seen[2:4])
+
+    def test_field_selection(self):
+        """Параметр fields оставляет только выбранные поля"""
+        data = self.get_json(reverse('api:posts'), fields='id,text')
+        self.assertEqual(set(data['results'][0]), {'id', 'text'})
+        response = self.client.get(reverse('api:posts'), {'fields': 'foo'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_errors(self):
+        """Неизвестные объекты дают 404, лента подписок — только с входом"""
+        urls = (
+            reverse('api:group_posts', args=['missing']),
+            reverse('api:profile_posts', args=['missing']),
+            reverse('api:post_comments', args=[0]),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertEqual(
+            self.client.get(reverse('api:follow')).status_code, 401)
+        self.assertEqual(
+            self.client.post(reverse('api:posts')).status_code, 405)
+
+    def test_follow_feed(self):
+        """Лента подписок содержит посты авторов, на которых подписан"""
+        self.client.force_login(self.reader)
+        data = self.get_json(reverse('api:follow'), limit=3)
+        self.assertEqual(len(data['results']), 3)
+        data = self.get_json(reverse('api:follow'), after=data['next'])
+        self.assertEqual(len(data['results']), 2)
+
+    def test_values_without_models(self):
+        """Страница читается одним запросом без лишних join"""
+        with self.assertNumQueries(1):
+            self.client.get(reverse('api:posts'), {'fields': 'id,text'})
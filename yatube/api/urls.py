@@ -0,0 +1,16 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'api'
+
+urlpatterns = [
+    path('v1/posts/', views.posts, name='posts'),
+    path('v1/groups/<slug:slug>/posts/',
+         views.group_posts, name='group_posts'),
+    path('v1/profiles/<str:username>/posts/',
+         views.profile_posts, name='profile_posts'),
+    path('v1/posts/<int:post_id>/comments/',
+         views.post_comments, name='post_comments'),
+    path('v1/follow/', views.follow, name='follow'),
+]
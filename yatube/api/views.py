@@ -0,0 +1,154 @@
+"""JSON API только для чтения: ленты постов и комментарии.
+
+Записи читаются через values() без создания объектов моделей, страницы
+листаются курсором (?after= и ?before=), а параметр fields оставляет
+в ответе только нужные поля. Время сериализации отдаётся в заголовке
+Server-Timing, его читает нагрузочный прогон.
+"""
+import json
+from time import perf_counter
+
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, JsonResponse
+from django.views.decorators.http import require_GET
+
+from core.db import read_replica
+from posts.feed import TIMELINE_ORDERING, get_feed
+from posts.groups import get_group
+from posts.models import Comment, Post, User
+from posts.utils import COMMENT_ORDERING, FEED_ORDERING, CursorPaginator
+from yatube.settings import API_MAX_PAGE_SIZE, API_PAGE_SIZE
+
+# Поле ответа -> поле запроса values()
+POST_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+    'comments_count': 'comments_count',
+}
+COMMENT_FIELDS = {
+    'id': 'id',
+    'post': 'post_id',
+    'author': 'author__username',
+    'text': 'text',
+    'created': 'created',
+}
+
+
+def image_url(name):
+    return default_storage.url(name) if name else None
+
+
+CONVERTERS = {'image': image_url}
+
+
+def error(status, detail):
+    return JsonResponse({'detail': detail}, status=status)
+
+
+def selected_fields(request, fields):
+    """Поля из параметра fields или все; None, если есть неизвестное."""
+    value = request.GET.get('fields')
+    if not value:
+        return list(fields)
+    names = [name for name in value.split(',') if name]
+    if not names or any(name not in fields for name in names):
+        return None
+    return list(dict.fromkeys(names))
+
+
+def page_size(request):
+    try:
+        limit = int(request.GET.get('limit', API_PAGE_SIZE))
+    except ValueError:
+        limit = API_PAGE_SIZE
+    return min(max(limit, 1), API_MAX_PAGE_SIZE)
+
+
+def paginated(request, queryset, fields, ordering):
+    """Страница записей queryset в JSON с курсорами соседних страниц."""
+    names = selected_fields(request, fields)
+    if names is None:
+        return error(400, f'Допустимые поля: {", ".join(fields)}')
+    # Поля сортировки нужны для курсора, даже если их не просили
+    columns = dict.fromkeys(
+        [fields[name] for name in names]
+        + [field.lstrip('-') for field in ordering])
+    paginator = CursorPaginator(
+        queryset.values(*columns), page_size(request), ordering)
+    page = paginator.get_page(
+        after=request.GET.get('after'), before=request.GET.get('before'))
+    start = perf_counter()
+    results = []
+    for row in page:
+        item = {}
+        for name in names:
+            value = row[fields[name]]
+            converter = CONVERTERS.get(name)
+            item[name] = converter(value) if converter else value
+        results.append(item)
+    content = json.dumps(
+        {
+            'results': results,
+            'next': page.next_cursor,
+            'previous': page.previous_cursor,
+        },
+        cls=DjangoJSONEncoder, ensure_ascii=False, separators=(',', ':'),
+    )
+    elapsed = perf_counter() - start
+    response = HttpResponse(content, content_type='application/json')
+    response['Server-Timing'] = f'serialize;dur={elapsed * 1000:.3f}'
+    return response
+
+
+@require_GET
+@read_replica
+def posts(request):
+    return paginated(
+        request, Post.objects.for_feed(), POST_FIELDS, FEED_ORDERING)
+
+
+@require_GET
+@read_replica
+def group_posts(request, slug):
+    group = get_group(slug)
+    if group is None:
+        return error(404, 'Группа не найдена')
+    return paginated(
+        request, Post.objects.for_feed().filter(group_id=group.id),
+        POST_FIELDS, FEED_ORDERING)
+
+
+@require_GET
+@read_replica
+def profile_posts(request, username):
+    author_id = User.objects.filter(username=username).values_list(
+        'id', flat=True).first()
+    if author_id is None:
+        return error(404, 'Автор не найден')
+    return paginated(
+        request, Post.objects.for_feed().filter(author_id=author_id),
+        POST_FIELDS, FEED_ORDERING)
+
+
+@require_GET
+@read_replica
+def post_comments(request, post_id):
+    if not Post.objects.filter(pk=post_id).exists():
+        return error(404, 'Пост не найден')
+    return paginated(
+        request, Comment.objects.filter(post_id=post_id),
+        COMMENT_FIELDS, COMMENT_ORDERING)
+
+
+@require_GET
+@read_replica
+def follow(request):
+    if not request.user.is_authenticated:
+        return error(401, 'Нужно войти')
+    return paginated(
+        request, get_feed(request.user), POST_FIELDS, TIMELINE_ORDERING)
@@ -0,0 +1,219 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends import locmem
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from . import perf
+
+_missing = object()
+# Попадания и промахи всех кешей процесса по классу бэкенда
+totals = Counter()
+
+
+class CountingCacheMixin:
+    """Считает попадания и промахи чтения кеша.
+
+    Счёт идёт и в замеры текущего запроса, и в общие totals процесса.
+    get_many базового класса читает ключи через get, так что он тоже
+    попадает в счёт.
+    """
+
+    def count(self, hit):
+        perf.count_cache(hit)
+        totals[(type(self).__name__, 'hits' if hit else 'misses')] += 1
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _missing, version)
+        self.count(value is not _missing)
+        return default if value is _missing else value
+
+    def stats(self):
+        name = type(self).__name__
+        return {
+            'hits': totals[(name, 'hits')],
+            'misses': totals[(name, 'misses')],
+        }
+
+
+class LocMemCache(CountingCacheMixin, locmem.LocMemCache):
+    pass
+
+
+class SQLiteCache(CountingCacheMixin, BaseCache):
+    """Кеш в файле SQLite, общий для всех процессов на одной машине.
+
+    LOCATION — путь к файлу. Вытеснение приближённо-LRU: время доступа
+    обновляется не чаще раза в ACCESS_RESOLUTION секунд, чтобы чтения
+    почти не писали в файл. Размер ограничен OPTIONS MAX_ENTRIES
+    и MAX_SIZE (байт), проверка идёт на каждой CULL_EVERY-й записи.
+    """
+    create_sql = (
+        'CREATE TABLE IF NOT EXISTS cache ('
+        'key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL, '
+        'accessed REAL NOT NULL, size INTEGER NOT NULL)',
+        'CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)',
+    )
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self.location = location
+        options = params.get('OPTIONS', {})
+        self.max_size = int(options.get('MAX_SIZE', 64 * 1024 * 1024))
+        self.access_resolution = float(options.get('ACCESS_RESOLUTION', 60))
+        self.cull_every = int(options.get('CULL_EVERY', 100))
+        self.busy_timeout = float(options.get('BUSY_TIMEOUT', 5))
+        self._local = threading.local()
+
+    @property
+    def connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            directory = os.path.dirname(self.location)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(
+                self.location, timeout=self.busy_timeout,
+                isolation_level=None, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            for sql in self.create_sql:
+                connection.execute(sql)
+            self._local.connection = connection
+            self._local.writes = 0
+        return connection
+
+    def _fetch(self, keys):
+        now = time.time()
+        placeholders = ', '.join('?' * len(keys))
+        rows = self.connection.execute(
+            f'SELECT key, value, expires, accessed FROM cache '
+            f'WHERE key IN ({placeholders})', keys).fetchall()
+        found = {}
+        stale = []
+        for key, value, expires, accessed in rows:
+            if expires is not None and expires <= now:
+                continue
+            found[key] = pickle.loads(value)
+            if now - accessed > self.access_resolution:
+                stale.append(key)
+        if stale:
+            self.connection.execute(
+                f'UPDATE cache SET accessed = ? WHERE key IN '
+                f'({", ".join("?" * len(stale))})', [now, *stale])
+        return found
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        found = self._fetch([key])
+        self.count(key in found)
+        return found.get(key, default)
+
+    def get_many(self, keys, version=None):
+        keys = {self.make_and_validate_key(key, version=version): key
+                for key in keys}
+        if not keys:
+            return {}
+        found = self._fetch(list(keys))
+        for key in keys:
+            self.count(key in found)
+        return {keys[key]: value for key, value in found.items()}
+
+    def _write(self, mode, key, value, timeout):
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        now = time.time()
+        if mode == 'add':
+            # Просроченная запись не мешает add
+            self.connection.execute(
+                'DELETE FROM cache WHERE key = ? AND expires <= ?',
+                [key, now])
+        cursor = self.connection.execute(
+            f'INSERT OR {"IGNORE" if mode == "add" else "REPLACE"} INTO '
+            f'cache (key, value, expires, accessed, size) '
+            f'VALUES (?, ?, ?, ?, ?)',
+            [key, data, self.get_backend_timeout(timeout), now, len(data)])
+        self._local.writes += 1
+        if self._local.writes % self.cull_every == 0:
+            self.cull()
+        return cursor.rowcount > 0
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        self._write('set', key, value, timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._write('add', key, value, timeout)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        cursor = self.connection.execute(
+            'UPDATE cache SET expires = ? WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)',
+            [self.get_backend_timeout(timeout), key, time.time()])
+        return cursor.rowcount > 0
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        cursor = self.connection.execute(
+            'DELETE FROM cache WHERE key = ?', [key])
+        return cursor.rowcount > 0
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self.connection.execute(
+            'SELECT 1 FROM cache WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)',
+            [key, time.time()]).fetchone() is not None
+
+    def clear(self):
+        self.connection.execute('DELETE FROM cache')
+
+    def cull(self):
+        """Убирает просроченное и давно не читанное сверх лимитов."""
+        connection = self.connection
+        connection.execute(
+            'DELETE FROM cache WHERE expires <= ?', [time.time()])
+        entries, size = connection.execute(
+            'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache').fetchone()
+        if entries <= self._max_entries and size <= self.max_size:
+            return
+        if not self._cull_frequency:
+            self.clear()
+            return
+        # Чистим с запасом в 1/cull_frequency, чтобы не делать это часто
+        target = min(self._max_entries, entries) * (
+            1 - 1 / self._cull_frequency)
+        excess = entries - int(target)
+        if size > self.max_size:
+            average = size / entries
+            excess = max(excess, int(
+                (size - self.max_size * (1 - 1 / self._cull_frequency))
+                / average))
+        connection.execute(
+            'DELETE FROM cache WHERE key IN '
+            '(SELECT key FROM cache ORDER BY accessed LIMIT ?)', [excess])
+
+    def stats(self):
+        entries, size = self.connection.execute(
+            'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache').fetchone()
+        return {**super().stats(), 'entries': entries, 'size': size}
+
+    def close(self, **kwargs):
+        # Соединение живёт всё время потока: открывать файл на каждый
+        # запрос дороже, чем держать его
+        pass
+
+
+def cache_stats():
+    """Статистика кешей, которые её ведут, по их именам в CACHES."""
+    return {
+        alias: caches[alias].stats() for alias in settings.CACHES
+        if hasattr(caches[alias], 'stats')
+    }
@@ -0,0 +1,76 @@
+"""Настройка соединений SQLite и чтение лент с реплики.
+
+Параметры берутся из django.conf.settings, а не импортом из
+yatube.settings: профиль settings_prod переопределяет их.
+"""
+import asyncio
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+
+_use_replica = ContextVar('use_replica', default=False)
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """Применяет SQLITE_PRAGMAS к каждому новому соединению SQLite."""
+    if connection.vendor != 'sqlite':
+        return
+    read_only = 'mode=ro' in str(connection.settings_dict['NAME'])
+    with connection.cursor() as cursor:
+        for name, value in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+            # Режим журнала хранится в файле, его ставит пишущее соединение
+            if read_only and name == 'journal_mode':
+                continue
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+@contextmanager
+def replica_reads():
+    """Чтения внутри блока уходят на реплику, если она настроена."""
+    token = _use_replica.set(True)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+def read_replica(view):
+    """Декоратор представления, которое только читает.
+
+    Для асинхронного представления флаг ставится в его задаче,
+    и sync_to_async переносит его в поток, где идут запросы к базе.
+    """
+    if asyncio.iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(*args, **kwargs):
+            with replica_reads():
+                return await view(*args, **kwargs)
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        with replica_reads():
+            return view(*args, **kwargs)
+    return wrapper
+
+
+class ReadReplicaRouter:
+    """Отправляет чтения помеченных представлений на READ_REPLICA."""
+
+    def db_for_read(self, model, **hints):
+        replica = getattr(settings, 'READ_REPLICA', None)
+        if replica and _use_replica.get():
+            return replica
+        return None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплика содержит те же данные, что и основная база
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db == 'default'
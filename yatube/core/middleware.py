@@ -0,0 +1,72 @@
+import asyncio
+from contextlib import ExitStack
+from time import perf_counter
+
+from asgiref.sync import markcoroutinefunction, sync_to_async
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from yatube.settings import PERF_ENABLED
+
+from . import perf
+
+
+def _query_timer(metrics):
+    def execute_wrapper(execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            metrics.timings['db'] += perf_counter() - start
+            metrics.queries += 1
+    return execute_wrapper
+
+
+def _wrap_connections(stack, metrics):
+    wrapper = _query_timer(metrics)
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(wrapper))
+
+
+def _view_name(request):
+    match = request.resolver_match
+    return match.view_name if match else 'unresolved'
+
+
+class PerfMiddleware:
+    """Замеряет запрос и копит статистику по имени его URL.
+
+    Считаются общее время, число и время запросов к базе, отрисовка
+    шаблонов, попадания в кеш и генерация миниатюр.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not PERF_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        with perf.track() as metrics, ExitStack() as stack:
+            _wrap_connections(stack, metrics)
+            response = self.get_response(request)
+            metrics.name = _view_name(request)
+        return response
+
+    async def __acall__(self, request):
+        with perf.track() as metrics, ExitStack() as stack:
+            # Соединения у каждого потока свои, поэтому замер ставится
+            # в потоке, где асинхронные представления ходят в базу
+            await sync_to_async(_wrap_connections)(stack, metrics)
+            try:
+                response = await self.get_response(request)
+            finally:
+                await sync_to_async(stack.close)()
+            metrics.name = _view_name(request)
+        return response
@@ -0,0 +1,219 @@
+"""Метрики производительности запросов, собранные в памяти процесса.
+
+Каждая метрика хранится в гистограмме с фиксированным набором корзин,
+поэтому память не растёт с числом запросов, а запись стоит одного
+поиска по списку границ.
+"""
+import bisect
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+
+QUANTILES = (0.5, 0.95, 0.99)
+# Времена в секундах: от 0.1 мс до ~2 минут с шагом около 19%
+TIME_BOUNDS = tuple(0.0001 * 2 ** (i / 4) for i in range(81))
+# Число запросов к базе: от 1 до ~1000
+COUNT_BOUNDS = tuple(sorted({round(2 ** (i / 4)) for i in range(41)}))
+TIMINGS = ('wall', 'db', 'template', 'thumbnail')
+
+_current = ContextVar('perf_metrics', default=None)
+
+
+class Histogram:
+    """Гистограмма с ограниченной памятью и оценкой перцентилей."""
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.buckets = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def add(self, value):
+        self.buckets[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, quantile):
+        """Верхняя граница корзины, в которую попал перцентиль."""
+        if not self.count:
+            return 0
+        rank = quantile * self.count
+        seen = 0
+        for index, bucket in enumerate(self.buckets):
+            seen += bucket
+            if seen >= rank:
+                if index < len(self.bounds):
+                    return min(self.bounds[index], self.max)
+                return self.max
+        return self.max
+
+    def as_dict(self):
+        data = {
+            f'p{round(quantile * 100)}': self.percentile(quantile)
+            for quantile in QUANTILES
+        }
+        data.update(count=self.count, sum=self.total, max=self.max)
+        return data
+
+
+class RequestMetrics:
+    """Замеры одного запроса, накапливаемые по ходу его обработки."""
+    __slots__ = ('name', 'timings', 'queries', 'cache_hits', 'cache_misses')
+
+    def __init__(self, name=None):
+        self.name = name
+        self.timings = dict.fromkeys(TIMINGS, 0.0)
+        self.queries = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+
+class ViewStats:
+    """Накопленная статистика одного представления."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.timings = {kind: Histogram(TIME_BOUNDS) for kind in TIMINGS}
+        self.queries = Histogram(COUNT_BOUNDS)
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def record(self, metrics):
+        with self.lock:
+            for kind, value in metrics.timings.items():
+                self.timings[kind].add(value)
+            self.queries.add(metrics.queries)
+            self.cache_hits += metrics.cache_hits
+            self.cache_misses += metrics.cache_misses
+
+    def as_dict(self):
+        with self.lock:
+            data = {
+                f'{kind}_seconds': histogram.as_dict()
+                for kind, histogram in self.timings.items()
+            }
+            data['queries'] = self.queries.as_dict()
+            data['cache_hits'] = self.cache_hits
+            data['cache_misses'] = self.cache_misses
+        return data
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views = {}
+
+    def record(self, metrics):
+        stats = self.views.get(metrics.name)
+        if stats is None:
+            with self.lock:
+                stats = self.views.setdefault(metrics.name, ViewStats())
+        stats.record(metrics)
+
+    def snapshot(self):
+        with self.lock:
+            views = dict(self.views)
+        return {name: stats.as_dict() for name, stats in sorted(views.items())}
+
+    def reset(self):
+        with self.lock:
+            self.views = {}
+
+
+registry = Registry()
+
+
+def current():
+    """Замеры текущего запроса или None вне отслеживаемого кода."""
+    return _current.get()
+
+
+@contextmanager
+def track(name=None):
+    """Собирает замеры блока и записывает их под именем name.
+
+    Имя можно задать и позже, через атрибут name выданного объекта:
+    представление запроса становится известно только после разбора URL.
+    """
+    metrics = RequestMetrics(name)
+    token = _current.set(metrics)
+    start = perf_counter()
+    try:
+        yield metrics
+    finally:
+        metrics.timings['wall'] = perf_counter() - start
+        _current.reset(token)
+        if metrics.name:
+            registry.record(metrics)
+
+
+@contextmanager
+def timer(kind):
+    """Добавляет время блока к замеру kind текущего запроса."""
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        metrics.timings[kind] += perf_counter() - start
+
+
+def count_cache(hit):
+    metrics = _current.get()
+    if metrics is not None:
+        if hit:
+            metrics.cache_hits += 1
+        else:
+            metrics.cache_misses += 1
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"')
+
+
+def to_prometheus(snapshot, prefix='yatube_view'):
+    """Текстовый формат Prometheus: summary на каждую метрику."""
+    lines = []
+    for key in (*(f'{kind}_seconds' for kind in TIMINGS), 'queries'):
+        metric = f'{prefix}_{key}'
+        lines.append(f'# TYPE {metric} summary')
+        for name, data in snapshot.items():
+            label = f'view="{_escape(name)}"'
+            histogram = data[key]
+            for quantile in QUANTILES:
+                value = histogram[f'p{round(quantile * 100)}']
+                lines.append(
+                    f'{metric}{{{label},quantile="{quantile}"}} {value}')
+            lines.append(f'{metric}_sum{{{label}}} {histogram["sum"]}')
+            lines.append(f'{metric}_count{{{label}}} {histogram["count"]}')
+    for counter in ('cache_hits', 'cache_misses'):
+        metric = f'{prefix}_{counter}_total'
+        lines.append(f'# TYPE {metric} counter')
+        for name, data in snapshot.items():
+            lines.append(
+                f'{metric}{{view="{_escape(name)}"}} {data[counter]}')
+    return '\n'.join(lines) + '\n'
+
+
+def caches_to_prometheus(caches, prefix='yatube_cache'):
+    """Счётчики и размеры кешей в текстовом формате Prometheus."""
+    lines = []
+    for key, kind in (('hits', 'counter'), ('misses', 'counter'),
+                      ('entries', 'gauge'), ('size', 'gauge')):
+        suffix = '_total' if kind == 'counter' else ''
+        metric = f'{prefix}_{key}{suffix}'
+        values = [(alias, stats[key]) for alias, stats in caches.items()
+                  if key in stats]
+        if not values:
+            continue
+        lines.append(f'# TYPE {metric} {kind}')
+        for alias, value in values:
+            lines.append(f'{metric}{{cache="{_escape(alias)}"}} {value}')
+    return '\n'.join(lines) + '\n' if lines else ''
@@ -1,4 +1,20 @@
-from django.test import TestCase
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+
+from . import perf
+from .cache import SQLiteCache
+from .db import ReadReplicaRouter, configure_sqlite, replica_reads
+from .middleware import PerfMiddleware
+
+User = get_user_model()
 
 
 class ViewTestClass(TestCase):
@@ -6,3 +22,133 @@ class ViewTestClass(TestCase):
         response = self.client.get('/nonexist-page/')
         self.assertEqual(response.status_code, 404)
         self.assertTemplateUsed(response, 'core/404.html')
+
+
+class PerfTests(TestCase):
+    """Класс тестирования метрик производительности"""
+    def setUp(self):
+        perf.registry.reset()
+
+    def test_histogram_percentiles(self):
+        """Перцентили оцениваются с точностью до корзины"""
+        histogram = perf.Histogram(perf.TIME_BOUNDS)
+        for ms in range(1, 101):
+            histogram.add(ms / 1000)
+        self.assertAlmostEqual(histogram.percentile(0.5), 0.05, delta=0.01)
+        self.assertAlmostEqual(histogram.percentile(0.99), 0.1, delta=0.02)
+        self.assertEqual(histogram.percentile(1), 0.1)
+
+    def test_middleware_records_view(self):
+        """Запрос попадает в статистику под именем своего URL"""
+        self.client.get('/')
+        self.client.get('/')
+        stats = perf.registry.snapshot()['posts:index']
+        self.assertEqual(stats['wall_seconds']['count'], 2)
+        self.assertGreater(stats['queries']['max'], 0)
+        self.assertGreater(stats['template_seconds']['sum'], 0)
+        self.assertGreater(stats['cache_hits'] + stats['cache_misses'], 0)
+
+    async def test_async_middleware(self):
+        """Под ASGI запросы к базе считаются в потоке представления"""
+        async def get_response(request):
+            await User.objects.acount()
+            return HttpResponse()
+
+        middleware = PerfMiddleware(get_response)
+        self.assertTrue(asyncio.iscoroutinefunction(middleware))
+        await middleware(RequestFactory().get('/'))
+        stats = perf.registry.snapshot()['unresolved']
+        self.assertEqual(stats['queries']['max'], 1)
+
+    def test_export_for_staff_only(self):
+        """Выгрузка метрик доступна только персоналу"""
+        response = self.client.get('/admin/perf/')
+        self.assertEqual(response.status_code, 302)
+        admin = User.objects.create_user(username='admin', is_staff=True)
+        self.client.force_login(admin)
+        self.client.get('/')
+        data = self.client.get('/admin/perf/').json()
+        self.assertIn('posts:index', data['views'])
+        self.assertIn('hits', data['caches']['default'])
+        response = self.client.get('/admin/perf/', {'format': 'prometheus'})
+        self.assertContains(
+            response, 'yatube_view_wall_seconds_count{view="posts:index"} 1')
+
+
+class SQLiteCacheTests(TestCase):
+    """Класс тестирования общего кеша в файле SQLite"""
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.location = os.path.join(directory.name, 'cache.sqlite3')
+
+    def make_cache(self, **options):
+        return SQLiteCache(self.location, {'OPTIONS': options})
+
+    def test_shared_between_instances(self):
+        """Запись одного экземпляра видна другому, как другому процессу"""
+        writer, reader = self.make_cache(), self.make_cache()
+        writer.set('key', {'value': 1})
+        self.assertEqual(reader.get('key'), {'value': 1})
+        self.assertFalse(reader.add('key', 2))
+        self.assertEqual(reader.get_many(['key', 'missing']),
+                         {'key': {'value': 1}})
+        reader.delete('key')
+        self.assertIsNone(writer.get('key'))
+
+    def test_expired_entries_are_misses(self):
+        """Просроченная запись не читается и не мешает add"""
+        cache = self.make_cache()
+        cache.set('key', 'old', timeout=-1)
+        self.assertEqual(cache.get('key', 'default'), 'default')
+        self.assertTrue(cache.add('key', 'new'))
+        self.assertEqual(cache.get('key'), 'new')
+
+    def test_lru_eviction(self):
+        """Сверх лимита вытесняются давно не читанные записи"""
+        cache = self.make_cache(MAX_ENTRIES=10, CULL_EVERY=1,
+                                ACCESS_RESOLUTION=0)
+        cache.set('hot', 'value')
+        for i in range(20):
+            cache.get('hot')
+            cache.set(f'cold{i}', i)
+        self.assertEqual(cache.get('hot'), 'value')
+        self.assertLessEqual(cache.stats()['entries'], 10)
+        self.assertIsNone(cache.get('cold0'))
+
+
+class DatabaseProfileTests(TestCase):
+    """Класс тестирования настройки соединений и реплики"""
+    @override_settings(SQLITE_PRAGMAS={'cache_size': -1234})
+    def test_pragmas_applied(self):
+        """PRAGMA из настроек применяются к соединению"""
+        configure_sqlite(sender=None, connection=connection)
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA cache_size')
+            self.assertEqual(cursor.fetchone()[0], -1234)
+
+    @override_settings(READ_REPLICA='replica')
+    def test_router_sends_marked_reads_to_replica(self):
+        """На реплику уходят только чтения помеченных представлений"""
+        router = ReadReplicaRouter()
+        self.assertIsNone(router.db_for_read(User))
+        with replica_reads():
+            self.assertEqual(router.db_for_read(User), 'replica')
+            self.assertEqual(router.db_for_write(User), 'default')
+
+    def test_prod_profile_enables_async_thumbnails(self):
+        """Боевой профиль включает фоновые миниатюры и для модулей"""
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': 'yatube.settings_prod'}
+        env.pop('YATUBE_THUMBNAIL_ASYNC', None)
+        code = (
+            'import django; django.setup(); '
+            'from django.conf import settings; '
+            'from yatube import settings as base; '
+            'print(settings.THUMBNAIL_ASYNC, base.THUMBNAIL_ASYNC)'
+        )
+        output = subprocess.run(
+            [sys.executable, '-c', code], env=env, check=True,
+            capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.dirname(__file__)),
+        ).stdout
+        self.assertEqual(output.split(), ['True', 'True'])
@@ -1,5 +1,10 @@
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import HttpResponse, JsonResponse
 from django.shortcuts import render
 
+from . import perf
+from .cache import cache_stats
+
 
 def page_not_found(request, exception):
     return render(request, 'core/404.html', {'path': request.path}, status=404)
@@ -15,3 +20,16 @@ def server_error(request):
 
 def permission_denied(request, exception):
     return render(request, 'core/403.html', status=403)
+
+
+@staff_member_required
+def perf_stats(request):
+    """Статистика производительности в JSON или формате Prometheus."""
+    snapshot = perf.registry.snapshot()
+    caches = cache_stats()
+    if request.GET.get('format') == 'prometheus':
+        return HttpResponse(
+            perf.to_prometheus(snapshot) + perf.caches_to_prometheus(caches),
+            content_type='text/plain; version=0.0.4; charset=utf-8',
+        )
+    return JsonResponse({'views': snapshot, 'caches': caches})
@@ -0,0 +1,18 @@
+from django.contrib import admin
+
+from .models import Job
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk',
+        'name',
+        'status',
+        'attempts',
+        'run_at',
+        'finished')
+    list_filter = ('status', 'name')
+    search_fields = ('key',)
+
+
+admin.site.register(Job, JobAdmin)
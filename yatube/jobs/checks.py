@@ -0,0 +1,23 @@
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Error, register
+
+from yatube.settings import JOBS_EAGER
+
+
+@register()
+def check_shared_cache(app_configs, **kwargs):
+    """Воркерам нужен кеш, общий с веб-процессами.
+
+    Задачи инвалидируют страницы через cache.bump; в кеше в памяти
+    процесса новые версии остаются у воркера, и сайт отдаёт старые
+    страницы до истечения срока.
+    """
+    if JOBS_EAGER or not isinstance(caches['default'], LocMemCache):
+        return []
+    return [Error(
+        'Фоновые задачи выполняются воркерами, а кеш по умолчанию '
+        'хранится в памяти процесса.',
+        hint='Задайте YATUBE_CACHE_BACKEND=sqlite или YATUBE_JOBS_EAGER=1.',
+        id='jobs.E001',
+    )]
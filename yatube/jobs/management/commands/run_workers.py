@@ -0,0 +1,36 @@
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from jobs.worker import run_worker
+from yatube.settings import JOBS_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = 'Выполняет фоновые задачи очереди в нескольких процессах'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=2)
+        parser.add_argument('--batch-size', type=int, default=JOBS_BATCH_SIZE)
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выполнить готовые задачи и выйти, например из cron',
+        )
+
+    def handle(self, *args, **options):
+        once = options['once']
+        batch_size = options['batch_size']
+        if options['processes'] == 1:
+            processed = run_worker(once, batch_size)
+        else:
+            # Соединения родителя не должны достаться процессам пула
+            connections.close_all()
+            with ProcessPoolExecutor(
+                    max_workers=options['processes']) as executor:
+                futures = [
+                    executor.submit(run_worker, once, batch_size)
+                    for _ in range(options['processes'])
+                ]
+                processed = sum(future.result() for future in futures)
+        self.stdout.write(self.style.SUCCESS(f'Выполнено задач: {processed}'))
@@ -0,0 +1,137 @@
+"""Очередь фоновых задач в таблице базы, без внешнего брокера.
+
+enqueue() пишет задачу в той же транзакции, что и изменение, которое
+её породило, поэтому откат изменения отменяет и задачу. Воркеры
+(run_workers) берут задачи в аренду на JOBS_LEASE_TIMEOUT секунд:
+аренда упавшего воркера истекает, и задачу забирает другой. Ошибка
+откладывает задачу с удваивающейся паузой, после JOBS_MAX_ATTEMPTS
+попыток она считается проваленной. В режиме JOBS_EAGER задачи
+выполняются сразу при вызове enqueue, как без очереди.
+"""
+import logging
+import random
+import traceback
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from yatube.settings import (JOBS_EAGER, JOBS_LEASE_TIMEOUT,
+                             JOBS_MAX_ATTEMPTS, JOBS_RETRY_BACKOFF,
+                             JOBS_RETRY_BACKOFF_MAX)
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# Имя задачи -> функция
+TASKS = {}
+
+
+def task(func):
+    """Регистрирует функцию как задачу очереди.
+
+    Аргументы задачи передаются по имени и хранятся в JSON, поэтому
+    это id и простые значения, а не объекты моделей.
+    """
+    func.task_name = f'{func.__module__}.{func.__name__}'
+    TASKS[func.task_name] = func
+    return func
+
+
+def enqueue(func, *, key=None, delay=0, **kwargs):
+    """Ставит задачу в очередь или, в режиме JOBS_EAGER, выполняет её.
+
+    key — ключ идемпотентности: задача с ключом, который уже есть
+    в таблице, повторно не добавляется.
+    """
+    if JOBS_EAGER:
+        func(**kwargs)
+        return
+    Job.objects.bulk_create([Job(
+        name=func.task_name,
+        kwargs=kwargs,
+        key=key,
+        run_at=timezone.now() + timedelta(seconds=delay),
+    )], ignore_conflicts=True)
+
+
+def _ready(now):
+    return (Q(status=Job.QUEUED, run_at__lte=now)
+            | Q(status=Job.RUNNING, leased_until__lt=now))
+
+
+def claim(worker, limit):
+    """Берёт в аренду до limit готовых задач для воркера worker."""
+    now = timezone.now()
+    ready = Job.objects.filter(_ready(now)).order_by('run_at', 'id')
+    lease = {
+        'status': Job.RUNNING,
+        'leased_until': now + timedelta(seconds=JOBS_LEASE_TIMEOUT),
+        'worker': worker,
+        'attempts': F('attempts') + 1,
+    }
+    if connection.features.has_select_for_update_skip_locked:
+        # Строки, которые забирает другой воркер, пропускаются,
+        # а не ждут конца его транзакции
+        with transaction.atomic():
+            ids = list(ready.select_for_update(
+                skip_locked=True).values_list('id', flat=True)[:limit])
+            Job.objects.filter(id__in=ids).update(**lease)
+    else:
+        # SQLite пишет в базу по одному, и один UPDATE с подзапросом
+        # не даст двум воркерам взять одну задачу
+        ids = list(ready.values_list('id', flat=True)[:limit])
+        Job.objects.filter(_ready(now), id__in=ids).update(**lease)
+    return list(Job.objects.filter(
+        id__in=ids, status=Job.RUNNING, worker=worker,
+        leased_until=lease['leased_until']).order_by('run_at', 'id'))
+
+
+def backoff(attempts):
+    """Пауза перед следующей попыткой, с разбросом против наплыва."""
+    delay = min(JOBS_RETRY_BACKOFF * 2 ** (attempts - 1),
+                JOBS_RETRY_BACKOFF_MAX)
+    return timedelta(seconds=delay * random.uniform(1, 1.2))
+
+
+def resolve(name):
+    """Функция задачи по имени; модуль импортируется при надобности."""
+    if name not in TASKS:
+        import_string(name)
+    return TASKS[name]
+
+
+def run_job(job):
+    """Выполняет задачу, взятую в аренду; True, если она удалась."""
+    leased = Job.objects.filter(pk=job.pk, worker=job.worker)
+    try:
+        resolve(job.name)(**job.kwargs)
+    except Exception:
+        logger.exception('Задача %s #%s не выполнена', job.name, job.pk)
+        error = traceback.format_exc()
+        if job.attempts >= JOBS_MAX_ATTEMPTS:
+            # Проваленная задача остаётся для разбора, но ключ отпускает:
+            # иначе ту же работу нельзя было бы поставить снова
+            leased.update(status=Job.FAILED, leased_until=None, error=error,
+                          finished=timezone.now(), key=None)
+        else:
+            leased.update(status=Job.QUEUED, leased_until=None, error=error,
+                          run_at=timezone.now() + backoff(job.attempts))
+        return False
+    leased.update(status=Job.DONE, leased_until=None,
+                  finished=timezone.now())
+    return True
+
+
+def purge(older_than):
+    """Удаляет выполненные задачи, завершённые раньше older_than.
+
+    Вместе с ними освобождаются их ключи идемпотентности; проваленные
+    задачи отпускают ключ сразу.
+    """
+    deleted, _ = Job.objects.filter(
+        status=Job.DONE, finished__lt=older_than).delete()
+    return deleted
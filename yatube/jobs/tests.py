@@ -0,0 +1,144 @@
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import SystemCheckError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from posts.models import FeedEntry, Follow, Post
+from yatube.settings import JOBS_MAX_ATTEMPTS
+
+from . import checks, queue
+from .models import Job
+from .worker import Worker
+
+User = get_user_model()
+
+calls = []
+
+
+@queue.task
+def remember(value):
+    calls.append(value)
+
+
+@queue.task
+def explode():
+    raise ValueError('Не вышло')
+
+
+@mock.patch.object(queue, 'JOBS_EAGER', False)
+class QueueTests(TestCase):
+    """Класс тестирования очереди задач"""
+    def setUp(self):
+        calls.clear()
+        self.worker = Worker(batch_size=10)
+
+    def test_enqueue_and_run(self):
+        """Задача ждёт воркера, ключ не даёт поставить её дважды"""
+        queue.enqueue(remember, key='remember:1', value=1)
+        queue.enqueue(remember, key='remember:1', value=1)
+        queue.enqueue(remember, value=2, delay=60)
+        self.assertEqual(calls, [])
+        self.assertEqual(self.worker.run_once(), 1)
+        self.assertEqual(calls, [1])
+        job = Job.objects.get(key='remember:1')
+        self.assertEqual(job.status, Job.DONE)
+        self.assertEqual(job.attempts, 1)
+        self.assertEqual(self.worker.run_once(), 0)
+
+    def test_eager(self):
+        """В режиме JOBS_EAGER задача выполняется сразу"""
+        with mock.patch.object(queue, 'JOBS_EAGER', True):
+            queue.enqueue(remember, value='сразу')
+        self.assertEqual(calls, ['сразу'])
+        self.assertFalse(Job.objects.exists())
+
+    def test_retry_with_backoff(self):
+        """Ошибка откладывает задачу, после всех попыток она провалена"""
+        queue.enqueue(explode)
+        self.worker.run_once()
+        job = Job.objects.get()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertIn('Не вышло', job.error)
+        for _ in range(JOBS_MAX_ATTEMPTS - 1):
+            Job.objects.update(run_at=timezone.now())
+            self.worker.run_once()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, JOBS_MAX_ATTEMPTS)
+
+    def test_expired_lease_is_reclaimed(self):
+        """Задачу упавшего воркера забирает другой после конца аренды"""
+        queue.enqueue(remember, value=3)
+        self.assertEqual(len(queue.claim('упавший', 10)), 1)
+        self.assertEqual(self.worker.run_once(), 0)
+        Job.objects.update(leased_until=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(self.worker.run_once(), 1)
+        self.assertEqual(calls, [3])
+
+    def test_purge_frees_keys(self):
+        """Старые выполненные задачи удаляются вместе с ключами"""
+        queue.enqueue(remember, key='remember:4', value=4)
+        self.worker.run_once()
+        self.assertEqual(queue.purge(timezone.now() + timedelta(days=1)), 1)
+        queue.enqueue(remember, key='remember:4', value=4)
+        self.assertTrue(Job.objects.filter(status=Job.QUEUED).exists())
+
+    def test_failed_job_frees_key(self):
+        """Проваленная задача не мешает поставить ту же работу снова"""
+        queue.enqueue(explode, key='explode:1')
+        for _ in range(JOBS_MAX_ATTEMPTS):
+            Job.objects.update(run_at=timezone.now())
+            self.worker.run_once()
+        self.assertTrue(Job.objects.filter(status=Job.FAILED).exists())
+        queue.enqueue(explode, key='explode:1')
+        self.assertTrue(Job.objects.filter(
+            status=Job.QUEUED, key='explode:1').exists())
+
+
+@mock.patch.object(queue, 'JOBS_EAGER', False)
+class PostJobsTests(TestCase):
+    """Класс тестирования задач постов через очередь"""
+    def test_fan_out_and_backfill_run_in_workers(self):
+        """Раскладка ленты и дозаполнение после подписки ждут воркеров"""
+        author = User.objects.create_user(username='author')
+        reader = User.objects.create_user(username='reader')
+        old_post = Post.objects.create(author=author, text='Старый пост')
+        Follow.objects.create(user=reader, author=author)
+        self.assertFalse(FeedEntry.objects.exists())
+        post = Post.objects.create(author=author, text='Новый пост')
+        out = StringIO()
+        call_command('run_workers', '--processes', 1, '--once', stdout=out)
+        self.assertIn('Выполнено задач: 3', out.getvalue())
+        self.assertEqual(
+            set(FeedEntry.objects.filter(user=reader).values_list(
+                'post_id', flat=True)),
+            {old_post.id, post.id})
+
+
+@mock.patch.object(checks, 'JOBS_EAGER', False)
+class SharedCacheCheckTests(TestCase):
+    """Класс тестирования проверки общего кеша для воркеров"""
+    def test_local_cache_rejected(self):
+        """С кешем в памяти процесса воркеры не запускаются"""
+        errors = checks.check_shared_cache(None)
+        self.assertEqual([error.id for error in errors], ['jobs.E001'])
+        with self.assertRaises(SystemCheckError):
+            call_command('run_workers', '--once', '--processes', 1,
+                         skip_checks=False, stdout=StringIO())
+
+    def test_shared_cache_accepted(self):
+        """Общий кеш в SQLite проверку проходит"""
+        with tempfile.TemporaryDirectory() as directory:
+            with override_settings(CACHES={'default': {
+                'BACKEND': 'core.cache.SQLiteCache',
+                'LOCATION': os.path.join(directory, 'cache.sqlite3'),
+            }}):
+                self.assertEqual(checks.check_shared_cache(None), [])
@@ -0,0 +1,65 @@
+import os
+import socket
+import time
+import uuid
+from datetime import timedelta
+
+from django.db import connections
+from django.utils import timezone
+
+from yatube.settings import (JOBS_BATCH_SIZE, JOBS_KEEP_DONE_DAYS,
+                             JOBS_POLL_INTERVAL)
+
+from . import queue
+
+# Как часто воркер без работы чистит выполненные задачи, секунд
+PURGE_INTERVAL = 60 * 60
+
+
+class Worker:
+    """Цикл одного воркера: аренда пачки задач и их выполнение."""
+
+    def __init__(self, batch_size=JOBS_BATCH_SIZE,
+                 poll_interval=JOBS_POLL_INTERVAL):
+        self.name = (f'{socket.gethostname()}:{os.getpid()}:'
+                     f'{uuid.uuid4().hex[:8]}')
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.purged = 0
+
+    def run_once(self):
+        """Выполняет одну пачку готовых задач; возвращает их число."""
+        jobs = queue.claim(self.name, self.batch_size)
+        for job in jobs:
+            queue.run_job(job)
+        return len(jobs)
+
+    def purge(self):
+        if time.monotonic() - self.purged < PURGE_INTERVAL:
+            return
+        self.purged = time.monotonic()
+        queue.purge(timezone.now() - timedelta(days=JOBS_KEEP_DONE_DAYS))
+
+    def run(self, once=False):
+        """Работает до прерывания, а с once — пока есть готовые задачи."""
+        processed = 0
+        try:
+            while True:
+                done = self.run_once()
+                processed += done
+                if done:
+                    continue
+                if once:
+                    break
+                self.purge()
+                time.sleep(self.poll_interval)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            connections.close_all()
+        return processed
+
+
+def run_worker(once=False, batch_size=JOBS_BATCH_SIZE):
+    """Точка входа процесса из пула run_workers."""
+    return Worker(batch_size=batch_size).run(once=once)
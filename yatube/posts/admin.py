@@ -1,6 +1,7 @@
 from django.contrib import admin
 
 from .models import Comment, Group, Post, Follow
+from .search import matching_post_ids, query_terms
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -15,6 +16,13 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        """Ищет по поисковому индексу вместо LIKE по тексту."""
+        query_stems = query_terms(search_term)
+        if not query_stems:
+            return queryset, False
+        return queryset.filter(pk__in=matching_post_ids(query_stems)), False
+
 
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group)
@@ -0,0 +1,170 @@
+"""Асинхронные варианты читающих страниц для работы под ASGI.
+
+Поведение и шаблоны те же, что у posts.views. Независимые запросы
+страницы запускаются вместе через asyncio.gather, а шаблон рисуется
+в потоке: теги и ленивые связи в нём читают базу синхронно. Пока
+страница ждёт базу или кеш, процесс обслуживает другие соединения.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.views import redirect_to_login
+from django.http import Http404
+from django.shortcuts import render
+
+from core.db import read_replica
+
+from .cache import (anonymous_page_cache, conditional_page,
+                    feed_cache_context)
+from .counters import author_follow_counts, author_posts_count
+from .feed import TIMELINE_ORDERING, get_feed
+from .follows import is_following, suggested_authors
+from .forms import CommentForm
+from .groups import get_group
+from .models import Post, User
+from .utils import FEED_ORDERING, get_comments_page, get_paginator
+from .views import (group_page_scopes, index_page_scopes, post_page_scopes,
+                    profile_page_scopes)
+
+arender = sync_to_async(render)
+afeed_cache_context = sync_to_async(feed_cache_context)
+
+
+def _load_page(queryset, request, ordering):
+    context = get_paginator(queryset, request, ordering)
+    # Посты страницы читаются здесь, а не при отрисовке шаблона
+    page_obj = context['page_obj']
+    page_obj.object_list = list(page_obj.object_list)
+    return context
+
+
+load_page = sync_to_async(_load_page)
+load_comments = sync_to_async(get_comments_page)
+
+
+def _load_user(request):
+    # Первое обращение к ленивому request.user читает сессию и базу,
+    # дальше он уже загружен и безопасен в асинхронном коде
+    request.user.is_authenticated
+    return request.user
+
+
+auser = sync_to_async(_load_user)
+
+
+async def apage_object(request, queryset, **lookup):
+    """Асинхронный page_object: объект страницы один раз за запрос."""
+    if not hasattr(request, '_page_object'):
+        found = [obj async for obj in queryset.filter(**lookup)[:1]]
+        request._page_object = found[0] if found else None
+    return request._page_object
+
+
+ais_following = sync_to_async(is_following)
+asuggested_authors = sync_to_async(suggested_authors)
+aget_group = sync_to_async(get_group)
+
+
+@read_replica
+@conditional_page(index_page_scopes)
+@anonymous_page_cache(index_page_scopes)
+async def index(request):
+    context = {
+        'index': True,
+    }
+    context.update(await load_page(
+        Post.objects.for_feed().order_by('-pub_date'), request,
+        FEED_ORDERING))
+    context.update(await afeed_cache_context(
+        request, context['page_obj'], 'posts', 'groups'))
+    return await arender(request, 'posts/index.html', context)
+
+
+@read_replica
+@conditional_page(group_page_scopes)
+@anonymous_page_cache(group_page_scopes)
+async def group_posts(request, slug):
+    # Группа берётся из реестра в кеше, лента читается по её id
+    group = await aget_group(slug)
+    if group is None:
+        raise Http404
+    context = {
+        'group': group,
+    }
+    context.update(await load_page(
+        Post.objects.for_feed().filter(group_id=group.id).order_by(
+            '-pub_date'),
+        request, FEED_ORDERING))
+    context.update(await afeed_cache_context(
+        request, context['page_obj'], f'group:{group.id}'))
+    return await arender(request, 'posts/group_list.html', context)
+
+
+@read_replica
+@conditional_page(profile_page_scopes)
+@anonymous_page_cache(profile_page_scopes)
+async def profile(request, username):
+    user = await auser(request)
+    # Автор (вместе со счётчиками) и страница постов не зависят
+    # друг от друга и ищутся по username одновременно
+    author, page_context = await asyncio.gather(
+        apage_object(
+            request, User.objects.select_related('stats'),
+            username=username),
+        load_page(
+            Post.objects.for_feed().filter(
+                author__username=username).order_by('-pub_date'),
+            request, FEED_ORDERING),
+    )
+    if author is None:
+        raise Http404
+    following = await ais_following(user, [author.id])
+    followers_count, following_count = author_follow_counts(author)
+    context = {
+        'author': author,
+        'author_posts_count': author_posts_count(author),
+        'author_followers_count': followers_count,
+        'author_following_count': following_count,
+        'following': following[author.id],
+    }
+    context.update(page_context)
+    context.update(await afeed_cache_context(
+        request, context['page_obj'], f'author:{author.id}', 'groups'))
+    return await arender(request, 'posts/profile.html', context)
+
+
+@read_replica
+@conditional_page(post_page_scopes)
+async def post_detail(request, post_id):
+    post, comments = await asyncio.gather(
+        apage_object(request, Post.objects.for_detail(), pk=post_id),
+        load_comments(post_id, request.GET.get('after')),
+    )
+    if post is None:
+        raise Http404
+    context = {
+        'post': post,
+        'author_posts': author_posts_count(post.author),
+        'comments': comments,
+        'form': CommentForm(),
+    }
+    return await arender(request, 'posts/post_detail.html', context)
+
+
+@read_replica
+async def follow_index(request):
+    user = await auser(request)
+    if not user.is_authenticated:
+        return redirect_to_login(request.get_full_path())
+    context = {
+        'user': user,
+        'follow': True,
+    }
+    context.update(await load_page(
+        get_feed(user), request, TIMELINE_ORDERING))
+    if not context['page_obj']:
+        context['suggestions'] = await asuggested_authors(user)
+    context.update(await afeed_cache_context(
+        request, context['page_obj'], f'follow:{user.id}', 'posts', 'groups',
+        per_user=True))
+    return await arender(request, 'posts/follow.html', context)
@@ -0,0 +1,231 @@
+"""Нагрузочный прогон страниц постов и JSON API.
+
+Запросы шлются либо через тестовый клиент Django в том же процессе
+(тогда известно и число запросов к базе), либо по HTTP на запущенный
+сервер. Кроме задержек считаются размер ответа и время сериализации
+из заголовка Server-Timing. Результаты можно сохранить как эталон
+и сравнивать с ним.
+"""
+import math
+from contextlib import ExitStack
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+
+import requests
+from django.conf import settings
+from django.contrib.auth import (BACKEND_SESSION_KEY, HASH_SESSION_KEY,
+                                 SESSION_KEY)
+from django.contrib.sessions.backends.db import SessionStore
+from django.db import connections
+from django.db.models import Count
+from django.test import Client
+from django.urls import reverse
+from django.utils.crypto import get_random_string
+
+from .models import AuthorStats, Follow, Group, Post, User
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def percentile(values, quantile):
+    """Перцентиль по ближайшему рангу; values уже отсортированы."""
+    if not values:
+        return 0
+    rank = max(math.ceil(quantile * len(values)), 1)
+    return values[rank - 1]
+
+
+def serialize_ms(server_timing):
+    """Время сериализации из заголовка Server-Timing или None."""
+    for metric in (server_timing or '').split(','):
+        name, *params = metric.strip().split(';')
+        if name != 'serialize':
+            continue
+        for param in params:
+            key, _, value = param.partition('=')
+            if key.strip() == 'dur':
+                return float(value)
+    return None
+
+
+def pick_sample():
+    """Типичные объекты для запросов: самые наполненные автор и группа."""
+    stats = AuthorStats.objects.select_related('user').order_by(
+        '-posts_count').first()
+    if stats is None:
+        return None
+    author = stats.user
+    follower = Follow.objects.values('user').annotate(
+        total=Count('id')).order_by('-total').first()
+    return {
+        'author': author,
+        'group': Group.objects.order_by('-posts_count').first(),
+        'post': Post.objects.filter(author=author).order_by(
+            '-pub_date').first(),
+        'user': (User.objects.get(pk=follower['user'])
+                 if follower else author),
+    }
+
+
+# Имя -> функция, строящая (метод, путь, данные, нужен ли вход)
+TARGETS = {
+    'index': lambda sample: ('get', reverse('posts:index'), None, False),
+    'group_posts': lambda sample: (
+        'get', reverse('posts:posts', args=[sample['group'].slug]),
+        None, False),
+    'profile': lambda sample: (
+        'get', reverse('posts:profile', args=[sample['author'].username]),
+        None, False),
+    'post_detail': lambda sample: (
+        'get', reverse('posts:post_detail', args=[sample['post'].id]),
+        None, False),
+    'post_comments': lambda sample: (
+        'get', reverse('posts:post_comments', args=[sample['post'].id]),
+        None, False),
+    'follow_index': lambda sample: (
+        'get', reverse('posts:follow_index'), None, True),
+    'add_comment': lambda sample: (
+        'post', reverse('posts:add_comment', args=[sample['post'].id]),
+        {'text': 'Комментарий нагрузочного теста'}, True),
+    'api_posts': lambda sample: (
+        'get', reverse('api:posts'), None, False),
+    'api_group_posts': lambda sample: (
+        'get', reverse('api:group_posts', args=[sample['group'].slug]),
+        None, False),
+    'api_profile_posts': lambda sample: (
+        'get',
+        reverse('api:profile_posts', args=[sample['author'].username]),
+        None, False),
+    'api_post_comments': lambda sample: (
+        'get', reverse('api:post_comments', args=[sample['post'].id]),
+        None, False),
+    'api_follow': lambda sample: ('get', reverse('api:follow'), None, True),
+}
+
+
+class ClientDriver:
+    """Запросы через тестовый клиент с подсчётом обращений к базе."""
+
+    def __init__(self, user):
+        self.client = Client()
+        self.client.force_login(user)
+        self.anonymous = Client()
+
+    def send(self, method, path, data, login):
+        queries = 0
+
+        def count(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        client = self.client if login else self.anonymous
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(count))
+            response = getattr(client, method)(path, data)
+        return (response.status_code, queries, len(response.content),
+                serialize_ms(response.get('Server-Timing')))
+
+    def close(self):
+        connections.close_all()
+
+
+class HttpDriver:
+    """Запросы по HTTP к запущенному серверу с той же базой."""
+
+    def __init__(self, user, base_url):
+        self.base_url = base_url.rstrip('/')
+        session = SessionStore()
+        session[SESSION_KEY] = str(user.pk)
+        session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.create()
+        self.csrf_token = get_random_string(32)
+        self.session = requests.Session()
+        self.session.cookies.set(settings.SESSION_COOKIE_NAME,
+                                 session.session_key)
+        self.session.cookies.set(settings.CSRF_COOKIE_NAME, self.csrf_token)
+        self.anonymous = requests.Session()
+
+    def send(self, method, path, data, login):
+        session = self.session if login else self.anonymous
+        response = session.request(
+            method, self.base_url + path, data=data,
+            headers={'X-CSRFToken': self.csrf_token},
+            allow_redirects=False,
+        )
+        return (response.status_code, None, len(response.content),
+                serialize_ms(response.headers.get('Server-Timing')))
+
+    def close(self):
+        self.session.close()
+        self.anonymous.close()
+
+
+def _worker(make_driver, request, count):
+    driver = make_driver()
+    samples = []
+    try:
+        for _ in range(count):
+            start = perf_counter()
+            status, *measures = driver.send(*request)
+            samples.append((perf_counter() - start, status, *measures))
+    finally:
+        driver.close()
+    return samples
+
+
+def run_target(make_driver, request, total, concurrency):
+    """Выполняет total запросов в concurrency потоков и сводит итог."""
+    shares = [total // concurrency + (i < total % concurrency)
+              for i in range(concurrency)]
+    start = perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [executor.submit(_worker, make_driver, request, share)
+                   for share in shares if share]
+        samples = [sample for future in futures for sample in future.result()]
+    elapsed = perf_counter() - start
+    latencies = sorted(sample[0] for sample in samples)
+    result = {
+        'requests': len(samples),
+        'errors': sum(sample[1] >= 400 for sample in samples),
+        'rps': len(samples) / elapsed if elapsed else 0,
+    }
+    for quantile in QUANTILES:
+        result[f'p{round(quantile * 100)}_ms'] = (
+            percentile(latencies, quantile) * 1000)
+    for key, index in (('queries', 2), ('bytes', 3), ('serialize_ms', 4)):
+        values = [sample[index] for sample in samples
+                  if sample[index] is not None]
+        result[key] = (sum(values) / len(values)) if values else None
+    return result
+
+
+def run(sample, names, total, concurrency, base_url=None):
+    user = sample['user']
+    if base_url:
+        def make_driver():
+            return HttpDriver(user, base_url)
+    else:
+        def make_driver():
+            return ClientDriver(user)
+    return {
+        name: run_target(make_driver, TARGETS[name](sample), total,
+                         concurrency)
+        for name in names
+    }
+
+
+def compare(baseline, results):
+    """Изменение p95 и req/s в процентах относительно эталона."""
+    changes = {}
+    for name, result in results.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        changes[name] = {
+            key: (result[key] - before[key]) / before[key] * 100
+            for key in ('p95_ms', 'rps') if before[key]
+        }
+    return changes
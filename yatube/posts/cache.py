@@ -0,0 +1,306 @@
+import asyncio
+import hashlib
+import math
+import random
+import time
+from datetime import datetime, timezone
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.utils.cache import (get_conditional_response, patch_cache_control,
+                                patch_vary_headers)
+from django.utils.http import http_date, quote_etag
+
+from yatube.settings import (FEED_CACHE_TIMEOUT, PAGE_CACHE_LOCK_TIMEOUT,
+                             PAGE_CACHE_LOCK_WAIT, PAGE_CACHE_STALE_TIMEOUT,
+                             PAGE_CACHE_TIMEOUT, PAGE_CACHE_XFETCH_BETA)
+
+VERSION_KEY = 'feed:version:{}'
+PAGE_KEY = 'page:{}'
+PAGE_LOCK_KEY = 'page:lock:{}'
+
+
+def get_versions(*scopes):
+    """Возвращает версии областей кеша, заводя недостающие."""
+    keys = [VERSION_KEY.format(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        for key in missing:
+            cache.add(key, time.time_ns(), None)
+        versions.update(cache.get_many(missing))
+    return [versions.get(key, 0) for key in keys]
+
+
+def bump(*scopes):
+    """Инвалидирует области кеша, меняя их версии."""
+    version = time.time_ns()
+    cache.set_many(
+        {VERSION_KEY.format(scope): version for scope in scopes}, None)
+
+
+def feed_cache_context(request, page_obj, *scopes, per_user=False):
+    """Ключ фрагментного кеша ленты: версии, режим, страница, зритель."""
+    if getattr(page_obj, 'is_cursor', False):
+        page = ('cursor', request.GET.get('after', ''),
+                request.GET.get('before', ''))
+    else:
+        page = ('page', page_obj.number)
+    viewer = (request.user.pk if per_user
+              else request.user.is_authenticated)
+    parts = (*scopes, *get_versions(*scopes), *page, viewer)
+    return {
+        'feed_cache_timeout': FEED_CACHE_TIMEOUT,
+        'feed_cache_key': ':'.join(str(part) for part in parts),
+    }
+
+
+def _page_versions(request, scopes_func, args, kwargs):
+    """Версии областей страницы, посчитанные один раз на запрос."""
+    if not hasattr(request, '_page_versions'):
+        scopes = scopes_func(request, *args, **kwargs)
+        request._page_versions = (
+            None if scopes is None else (scopes, get_versions(*scopes)))
+    return request._page_versions
+
+
+def _etag(request, scopes_func, args, kwargs):
+    page = _page_versions(request, scopes_func, args, kwargs)
+    if page is None:
+        return None
+    scopes, versions = page
+    viewer = ''
+    if request.user.is_authenticated:
+        # В формах страницы лежит CSRF-токен: после нового входа секрет
+        # меняется, и страницу со старым токеном нельзя подтверждать 304
+        get_token(request)
+        viewer = f'{request.user.pk}:{request.META["CSRF_COOKIE"]}'
+    parts = (*scopes, *versions, request.get_full_path(), viewer)
+    return quote_etag(hashlib.md5(
+        ':'.join(str(part) for part in parts).encode()).hexdigest())
+
+
+def _last_modified(request, scopes_func, args, kwargs):
+    page = _page_versions(request, scopes_func, args, kwargs)
+    if page is None or request.user.is_authenticated:
+        return None
+    return int(datetime.fromtimestamp(
+        max(page[1]) / 1e9, tz=timezone.utc).timestamp())
+
+
+def _check_conditions(request, scopes_func, args, kwargs):
+    """(ETag, Last-Modified, ответ 304/412 или None)."""
+    etag = _etag(request, scopes_func, args, kwargs)
+    last_modified = _last_modified(request, scopes_func, args, kwargs)
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified)
+    return etag, last_modified, response
+
+
+def _finish_conditional(request, response, etag, last_modified):
+    patch_vary_headers(response, ('Cookie',))
+    if response.get('X-Page-Cache') == 'stale':
+        # Устаревшая копия не соответствует текущим версиям: с их ETag
+        # клиент получал бы на неё 304 и не увидел бы новую страницу
+        patch_cache_control(response, no_store=True)
+        return response
+    if request.method in ('GET', 'HEAD'):
+        if last_modified and not response.has_header('Last-Modified'):
+            response['Last-Modified'] = http_date(last_modified)
+        if etag:
+            response.headers.setdefault('ETag', etag)
+    # Браузер хранит страницу, но каждый раз сверяет ETag
+    if request.user.is_authenticated:
+        patch_cache_control(response, no_cache=True, private=True)
+    else:
+        patch_cache_control(response, no_cache=True)
+    return response
+
+
+def conditional_page(scopes_func):
+    """Условный GET для страницы, собранной из областей кеша.
+
+    scopes_func(request, *args, **kwargs) возвращает области страницы
+    или None, если объекта нет. ETag строится из их версий, запроса,
+    зрителя и его CSRF-секрета, Last-Modified — из самой свежей версии
+    (только для гостей: если вошедшему пользователю хватит одной даты,
+    он может получить чужую шапку). При совпадении 304 отдаётся до
+    запуска представления. Подходит и для асинхронных представлений:
+    проверка, читающая базу и сессию, выполняется тогда в потоке.
+    """
+    def decorator(view):
+        if asyncio.iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                etag, last_modified, response = await sync_to_async(
+                    _check_conditions)(request, scopes_func, args, kwargs)
+                if response is None:
+                    response = await view(request, *args, **kwargs)
+                return _finish_conditional(
+                    request, response, etag, last_modified)
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            etag, last_modified, response = _check_conditions(
+                request, scopes_func, args, kwargs)
+            if response is None:
+                response = view(request, *args, **kwargs)
+            return _finish_conditional(request, response, etag, last_modified)
+        return wrapper
+    return decorator
+
+
+def _should_refresh(entry, versions, now):
+    """Пора ли пересобрать страницу из кеша.
+
+    Кроме смены версий и истечения срока, запись обновляется заранее
+    с вероятностью, растущей к концу срока (XFetch): чем дольше страница
+    собирается, тем раньше кто-то возьмётся её обновить, и к моменту
+    истечения свежая копия уже готова.
+    """
+    if entry['versions'] != versions:
+        return True
+    early = entry['delta'] * PAGE_CACHE_XFETCH_BETA * -math.log(
+        1 - random.random())
+    return now + early >= entry['expires']
+
+
+def _is_fresh(entry, versions):
+    return entry is not None and not _should_refresh(
+        entry, versions, time.time())
+
+
+def _to_response(entry, versions):
+    response = HttpResponse(entry['content'], status=entry['status'])
+    for name, value in entry['headers']:
+        response[name] = value
+    response['X-Page-Cache'] = (
+        'hit' if entry['versions'] == versions else 'stale')
+    return response
+
+
+def _page_keys(request, scopes_func, args, kwargs):
+    """(ключ, ключ блокировки, версии) или None, если кеш не нужен."""
+    if (request.method not in ('GET', 'HEAD')
+            or request.user.is_authenticated):
+        return None
+    page = _page_versions(request, scopes_func, args, kwargs)
+    if page is None:
+        return None
+    path_hash = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return PAGE_KEY.format(path_hash), PAGE_LOCK_KEY.format(path_hash), page[1]
+
+
+def _page_entry(response, versions, start):
+    """Запись кеша для собранной страницы или None, если она не общая."""
+    response['X-Page-Cache'] = 'miss'
+    if response.status_code != 200 or response.cookies:
+        return None
+    finished = time.time()
+    return {
+        'versions': versions,
+        'status': response.status_code,
+        'content': response.content,
+        'headers': [(name, value) for name, value in response.items()
+                    if name != 'X-Page-Cache'],
+        'delta': finished - start,
+        'expires': finished + PAGE_CACHE_TIMEOUT,
+    }
+
+
+def _wait_for_page(key):
+    """Ждёт копию, которую собирает другой процесс, или None."""
+    deadline = time.time() + PAGE_CACHE_LOCK_WAIT
+    while time.time() < deadline:
+        time.sleep(0.05)
+        entry = cache.get(key)
+        if entry:
+            return entry
+    return None
+
+
+async def _await_page(key):
+    deadline = time.time() + PAGE_CACHE_LOCK_WAIT
+    while time.time() < deadline:
+        await asyncio.sleep(0.05)
+        entry = await cache.aget(key)
+        if entry:
+            return entry
+    return None
+
+
+def _sync_page_cache(view, scopes_func):
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        keys = _page_keys(request, scopes_func, args, kwargs)
+        if keys is None:
+            return view(request, *args, **kwargs)
+        key, lock_key, versions = keys
+        entry = cache.get(key)
+        if _is_fresh(entry, versions):
+            return _to_response(entry, versions)
+        if not cache.add(lock_key, 1, PAGE_CACHE_LOCK_TIMEOUT):
+            entry = entry or _wait_for_page(key)
+            if entry:
+                return _to_response(entry, versions)
+            return view(request, *args, **kwargs)
+        try:
+            start = time.time()
+            response = view(request, *args, **kwargs)
+            entry = _page_entry(response, versions, start)
+            if entry:
+                cache.set(key, entry,
+                          PAGE_CACHE_TIMEOUT + PAGE_CACHE_STALE_TIMEOUT)
+        finally:
+            cache.delete(lock_key)
+        return response
+    return wrapper
+
+
+def _async_page_cache(view, scopes_func):
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        keys = await sync_to_async(_page_keys)(
+            request, scopes_func, args, kwargs)
+        if keys is None:
+            return await view(request, *args, **kwargs)
+        key, lock_key, versions = keys
+        entry = await cache.aget(key)
+        if _is_fresh(entry, versions):
+            return _to_response(entry, versions)
+        if not await cache.aadd(lock_key, 1, PAGE_CACHE_LOCK_TIMEOUT):
+            entry = entry or await _await_page(key)
+            if entry:
+                return _to_response(entry, versions)
+            return await view(request, *args, **kwargs)
+        try:
+            start = time.time()
+            response = await view(request, *args, **kwargs)
+            entry = _page_entry(response, versions, start)
+            if entry:
+                await cache.aset(
+                    key, entry, PAGE_CACHE_TIMEOUT + PAGE_CACHE_STALE_TIMEOUT)
+        finally:
+            await cache.adelete(lock_key)
+        return response
+    return wrapper
+
+
+def anonymous_page_cache(scopes_func):
+    """Кеш целых страниц для гостей с защитой от наплыва.
+
+    Ключ — полный путь с параметрами, актуальность — версии областей
+    из scopes_func, поэтому изменения постов сразу делают копию
+    устаревшей. Пересобирает её один процесс под блокировкой cache.add,
+    остальные в это время отдают устаревшую копию; без копии они
+    недолго ждут результата, а не идут в базу все разом.
+    """
+    def decorator(view):
+        if asyncio.iscoroutinefunction(view):
+            return _async_page_cache(view, scopes_func)
+        return _sync_page_cache(view, scopes_func)
+    return decorator
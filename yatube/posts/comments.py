@@ -0,0 +1,119 @@
+"""Запись комментариев: сразу или пачками через буфер.
+
+Буфер нужен под наплыв комментариев к популярным постам: вместо
+транзакции, обновления счётчика и сброса кеша на каждый комментарий
+пачка пишется одной транзакцией, а счётчик и кеш поста меняются
+по разу на пачку.
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import Counter
+
+from django.db import connections, transaction
+
+from yatube.settings import (COMMENT_BUFFER_ENABLED, COMMENT_BUFFER_LATENCY,
+                             COMMENT_BUFFER_SIZE)
+
+from . import cache, counters
+from .models import Comment, Post
+
+logger = logging.getLogger(__name__)
+
+
+def save_comments(comments):
+    """Пишет комментарии одной транзакцией в обход сигналов.
+
+    Сбрасывается кеш только страниц затронутых постов. Комментарии
+    к постам, удалённым за время ожидания, пропускаются.
+    """
+    with transaction.atomic():
+        existing = set(Post.objects.filter(
+            pk__in={comment.post_id for comment in comments}
+        ).values_list('id', flat=True))
+        comments = [
+            comment for comment in comments if comment.post_id in existing]
+        Comment.objects.bulk_create(comments)
+        totals = Counter(comment.post_id for comment in comments)
+        for post_id, total in totals.items():
+            counters.change_post_comments(post_id, total)
+    if totals:
+        cache.bump(*(f'post:{post_id}' for post_id in totals))
+    return comments
+
+
+class CommentBuffer:
+    """Копит комментарии и отдаёт их фоновому потоку пачками.
+
+    Пачка уходит, когда в ней max_size комментариев или когда самый
+    старый из них ждёт max_latency секунд. Остаток пишется при выходе
+    из процесса.
+    """
+
+    def __init__(self, max_size, max_latency):
+        self.max_size = max_size
+        self.max_latency = max_latency
+        self.condition = threading.Condition()
+        # (время добавления, комментарий)
+        self.pending = []
+        self.thread = None
+
+    def add(self, comment):
+        with self.condition:
+            self.pending.append((time.monotonic(), comment))
+            if self.thread is None:
+                self.thread = threading.Thread(
+                    target=self.run, name='comment-buffer', daemon=True)
+                self.thread.start()
+                atexit.register(self.flush)
+            self.condition.notify()
+
+    def take(self):
+        """Ждёт, пока пачка наберётся или состарится, и забирает её."""
+        with self.condition:
+            while True:
+                if not self.pending:
+                    self.condition.wait()
+                    continue
+                remaining = (self.pending[0][0] + self.max_latency
+                             - time.monotonic())
+                if len(self.pending) >= self.max_size or remaining <= 0:
+                    return self._pop_batch()
+                self.condition.wait(remaining)
+
+    def _pop_batch(self):
+        batch = [comment for _, comment in self.pending[:self.max_size]]
+        del self.pending[:self.max_size]
+        return batch
+
+    def write(self, batch):
+        try:
+            save_comments(batch)
+        except Exception:
+            logger.exception('Не удалось записать %s комментариев', len(batch))
+
+    def run(self):
+        while True:
+            self.write(self.take())
+            connections.close_all()
+
+    def flush(self):
+        """Пишет всё накопленное сразу, в текущем потоке."""
+        while True:
+            with self.condition:
+                batch = self._pop_batch()
+            if not batch:
+                return
+            self.write(batch)
+
+
+_buffer = CommentBuffer(COMMENT_BUFFER_SIZE, COMMENT_BUFFER_LATENCY)
+
+
+def submit_comment(comment):
+    """Сохраняет комментарий сразу или, если буфер включён, через него."""
+    if COMMENT_BUFFER_ENABLED:
+        _buffer.add(comment)
+    else:
+        comment.save()
@@ -0,0 +1,112 @@
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
+
+from . import cache
+from .models import AuthorStats, Follow, Group, Post
+
+
+def _shifted(field, delta):
+    """Значение счётчика после сдвига, но не меньше нуля.
+
+    Разошедшийся с данными счётчик иначе ушёл бы в минус, и обновление
+    PositiveIntegerField упало бы с IntegrityError.
+    """
+    return Greatest(F(field) + delta, 0)
+
+
+def _ensure_stats(user_id, delta):
+    """Создаёт строку счётчиков автора только при увеличении.
+
+    Уменьшение приходит и из каскадного удаления пользователя: созданная
+    в нём строка ссылалась бы на удалённого пользователя.
+    """
+    if delta > 0:
+        AuthorStats.objects.get_or_create(user_id=user_id)
+
+
+def change_author_posts(user_id, delta):
+    _ensure_stats(user_id, delta)
+    AuthorStats.objects.filter(user_id=user_id).update(
+        posts_count=_shifted('posts_count', delta))
+
+
+def change_follows(user_id, author_id, delta):
+    """Подписки пользователя и подписчики автора."""
+    for stats_id, field in ((user_id, 'following_count'),
+                            (author_id, 'followers_count')):
+        _ensure_stats(stats_id, delta)
+        AuthorStats.objects.filter(user_id=stats_id).update(
+            **{field: _shifted(field, delta)})
+
+
+def change_group_posts(group_id, delta):
+    Group.objects.filter(pk=group_id).update(
+        posts_count=_shifted('posts_count', delta))
+
+
+def change_post_comments(post_id, delta):
+    Post.objects.filter(pk=post_id).update(
+        comments_count=_shifted('comments_count', delta))
+
+
+def author_posts_count(user):
+    """Число постов автора без агрегации по таблице постов."""
+    stats = getattr(user, 'stats', None)
+    return stats.posts_count if stats else 0
+
+
+def author_follow_counts(user):
+    """(подписчиков, подписок) автора из его счётчиков."""
+    stats = getattr(user, 'stats', None)
+    return (stats.followers_count, stats.following_count) if stats else (0, 0)
+
+
+def _counts_by(queryset, field):
+    return dict(queryset.values_list(field).annotate(
+        total=Count('id')).order_by())
+
+
+def reconcile_counters(dry_run=False):
+    """Сверяет счётчики с данными и чинит расхождения.
+
+    Возвращает число исправленных записей по каждому счётчику.
+    """
+    fixed = {'authors': 0, 'groups': 0, 'posts': 0}
+    fields = ('posts_count', 'followers_count', 'following_count')
+    actual = [
+        _counts_by(Post.objects, 'author'),
+        _counts_by(Follow.objects, 'author'),
+        _counts_by(Follow.objects, 'user'),
+    ]
+    stored = {
+        row[0]: row[1:]
+        for row in AuthorStats.objects.values_list('user_id', *fields)
+    }
+    scopes = set()
+    for user_id in set().union(*actual, stored):
+        totals = tuple(counts.get(user_id, 0) for counts in actual)
+        if stored.get(user_id) != totals:
+            fixed['authors'] += 1
+            scopes.update((f'author:{user_id}', f'follow_counts:{user_id}'))
+            if not dry_run:
+                AuthorStats.objects.update_or_create(
+                    user_id=user_id, defaults=dict(zip(fields, totals)))
+    groups = Group.objects.annotate(total=Count('posts')).exclude(
+        posts_count=F('total'))
+    for group in groups:
+        fixed['groups'] += 1
+        scopes.update(('groups', f'group:{group.pk}'))
+        if not dry_run:
+            Group.objects.filter(pk=group.pk).update(posts_count=group.total)
+    posts = Post.objects.annotate(total=Count('comments')).exclude(
+        comments_count=F('total')).only('id')
+    for post in posts.iterator():
+        fixed['posts'] += 1
+        scopes.add(f'post:{post.pk}')
+        if not dry_run:
+            Post.objects.filter(pk=post.pk).update(
+                comments_count=post.total)
+    if scopes and not dry_run:
+        # Страницы со старыми числами в кеше больше не отдаются
+        cache.bump(*scopes)
+    return fixed
@@ -0,0 +1,75 @@
+from collections import defaultdict
+
+from django.db.models import F
+
+from yatube.settings import FEED_BACKFILL_SIZE, FEED_BATCH_SIZE
+
+from .models import FeedEntry, Follow, Post
+
+# Сортировка по полям FeedEntry, чтобы чтение шло по индексу ленты
+TIMELINE_ORDERING = ('-feed_pub_date', '-feed_post')
+
+
+def get_feed(user):
+    """Лента подписок пользователя из материализованных записей."""
+    return Post.objects.for_feed().filter(
+        feed_entries__user=user
+    ).annotate(
+        feed_pub_date=F('feed_entries__pub_date'),
+        feed_post=F('feed_entries__post_id'),
+    ).order_by(*TIMELINE_ORDERING)
+
+
+def _bulk_insert(entries):
+    FeedEntry.objects.bulk_create(
+        entries, batch_size=FEED_BATCH_SIZE, ignore_conflicts=True)
+
+
+def fan_out_post(post):
+    """Раскладывает новый пост по лентам всех подписчиков автора."""
+    followers = Follow.objects.filter(
+        author_id=post.author_id).values_list('user_id', flat=True)
+    entries = []
+    for user_id in followers.iterator(chunk_size=FEED_BATCH_SIZE):
+        entries.append(FeedEntry(
+            user_id=user_id, post_id=post.id, pub_date=post.pub_date))
+        if len(entries) >= FEED_BATCH_SIZE:
+            _bulk_insert(entries)
+            entries = []
+    if entries:
+        _bulk_insert(entries)
+
+
+def fan_out_posts(posts):
+    """Раскладывает пачку постов по лентам подписчиков их авторов."""
+    by_author = defaultdict(list)
+    for post in posts:
+        by_author[post.author_id].append(post)
+    followers = Follow.objects.filter(
+        author_id__in=by_author).values_list('author_id', 'user_id')
+    entries = []
+    for author_id, user_id in followers.iterator(chunk_size=FEED_BATCH_SIZE):
+        for post in by_author[author_id]:
+            entries.append(FeedEntry(
+                user_id=user_id, post_id=post.id, pub_date=post.pub_date))
+        if len(entries) >= FEED_BATCH_SIZE:
+            _bulk_insert(entries)
+            entries = []
+    if entries:
+        _bulk_insert(entries)
+
+
+def backfill_feed(user_id, author_id):
+    """Добавляет в ленту последние посты автора после подписки."""
+    posts = Post.objects.filter(author_id=author_id).order_by(
+        '-pub_date').values_list('id', 'pub_date')[:FEED_BACKFILL_SIZE]
+    _bulk_insert([
+        FeedEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+        for post_id, pub_date in posts
+    ])
+
+
+def prune_feed(user_id, author_id):
+    """Убирает из ленты посты автора после отписки."""
+    FeedEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id).delete()
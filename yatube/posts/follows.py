@@ -0,0 +1,119 @@
+"""Граф подписок: кого читает пользователь, счётчики и рекомендации.
+
+Авторы, на которых подписан пользователь, хранятся в кеше отсортированным
+массивом id под версией области follow:<id>, поэтому проверка подписки
+на всех авторов страницы — одно чтение кеша и двоичный поиск. Подписчиков
+популярного автора бывают сотни тысяч, поэтому их список не кешируется:
+рассылка ленты читает их из базы пачками (feed.fan_out_post), а их число
+хранится в AuthorStats.
+"""
+from array import array
+from bisect import bisect_left
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+
+from yatube.settings import (FOLLOW_SUGGESTIONS, FOLLOW_SUGGESTIONS_SAMPLE,
+                             FOLLOWING_CACHE_TIMEOUT)
+
+from .cache import get_versions
+from .models import AuthorStats, Follow, FollowSuggestion
+
+FOLLOWING_KEY = 'following:{}:{}'
+
+
+def follow_scopes(follow):
+    """Области кеша подписки: лента зрителя и счётчики обоих профилей."""
+    return (f'follow:{follow.user_id}', f'follow_counts:{follow.user_id}',
+            f'follow_counts:{follow.author_id}')
+
+
+def following_ids(user_id):
+    """Отсортированный массив id авторов, на которых подписан user_id."""
+    version, = get_versions(f'follow:{user_id}')
+    key = FOLLOWING_KEY.format(user_id, version)
+    ids = cache.get(key)
+    if ids is None:
+        ids = array('q', Follow.objects.filter(user_id=user_id).order_by(
+            'author_id').values_list('author_id', flat=True))
+        cache.set(key, ids, FOLLOWING_CACHE_TIMEOUT)
+    return ids
+
+
+def _contains(ids, value):
+    index = bisect_left(ids, value)
+    return index < len(ids) and ids[index] == value
+
+
+def is_following(user, author_ids):
+    """{id автора: подписан ли на него user} сразу для всех авторов."""
+    if not user.is_authenticated:
+        return dict.fromkeys(author_ids, False)
+    ids = following_ids(user.pk)
+    return {author_id: _contains(ids, author_id) for author_id in author_ids}
+
+
+def suggested_authors(user, limit=FOLLOW_SUGGESTIONS):
+    """Рекомендованные авторы, кроме тех, на кого уже есть подписка.
+
+    Рекомендации считаются офлайн и могут отставать от подписок,
+    поэтому они ещё раз сверяются со свежим списком из кеша.
+    """
+    suggestions = list(FollowSuggestion.objects.filter(
+        user_id=user.pk).select_related('author__stats').order_by(
+        '-score', 'author_id')[:limit])
+    followed = is_following(user, [item.author_id for item in suggestions])
+    return [item.author for item in suggestions
+            if not followed[item.author_id]]
+
+
+def _user_suggestions(user_id, popular, limit):
+    """Кандидаты: кого читают те, кого читает пользователь.
+
+    Вес — число таких связей; берутся последние FOLLOW_SUGGESTIONS_SAMPLE
+    подписок, чтобы пользователь с тысячами подписок не читал весь граф.
+    Свободные места занимают популярные авторы с весом 0.
+    """
+    followed = following_ids(user_id)
+    sample = Follow.objects.filter(user_id=user_id).order_by(
+        '-id').values_list('author_id', flat=True)[:FOLLOW_SUGGESTIONS_SAMPLE]
+    candidates = Follow.objects.filter(
+        user_id__in=list(sample)
+    ).exclude(
+        author_id=user_id
+    ).values_list('author_id').annotate(
+        score=Count('id')
+    ).order_by('-score', 'author_id')
+    found = {}
+    for author_id, score in candidates.iterator(chunk_size=limit * 4):
+        if not _contains(followed, author_id):
+            found[author_id] = score
+            if len(found) >= limit:
+                break
+    for author_id in popular:
+        if len(found) >= limit:
+            break
+        if author_id != user_id and not _contains(followed, author_id):
+            found.setdefault(author_id, 0)
+    return [FollowSuggestion(user_id=user_id, author_id=author_id, score=score)
+            for author_id, score in found.items()]
+
+
+def build_suggestions(user_ids, limit=FOLLOW_SUGGESTIONS):
+    """Пересчитывает рекомендации пользователей user_ids.
+
+    Возвращает число сохранённых рекомендаций.
+    """
+    user_ids = list(user_ids)
+    # Самые читаемые авторы с запасом на тех, кто уже на них подписан
+    popular = list(AuthorStats.objects.filter(followers_count__gt=0).order_by(
+        '-followers_count', 'user_id').values_list(
+        'user_id', flat=True)[:limit * 4])
+    suggestions = []
+    for user_id in user_ids:
+        suggestions.extend(_user_suggestions(user_id, popular, limit))
+    with transaction.atomic():
+        FollowSuggestion.objects.filter(user_id__in=user_ids).delete()
+        FollowSuggestion.objects.bulk_create(suggestions)
+    return len(suggestions)
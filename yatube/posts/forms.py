@@ -1,7 +1,11 @@
 from django import forms
 from django.contrib.auth import get_user_model
 
+from yatube.settings import POST_IMAGE_MAX_PIXELS, POST_IMAGE_MAX_SIZE
+
+from .groups import GroupChoiceIterator
 from .models import Comment, Post
+from .uploads import downscale_image, is_oversized
 
 User = get_user_model()
 
@@ -21,6 +25,42 @@ class PostForm(forms.ModelForm):
             'image': 'Изображение поста',
         }
 
+    def __init__(self, *args, upload_oversized=False, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Варианты группы берутся из кеша; выбранная группа при
+        # проверке формы по-прежнему ищется в базе
+        group = self.fields['group']
+        group.iterator = GroupChoiceIterator
+        group.widget.choices = group.choices
+        image = self.files.get('image')
+        # Слишком большой файл не передаём в Pillow: ошибка будет в clean()
+        self.image_oversized = upload_oversized or (
+            bool(image) and is_oversized(image))
+        if self.image_oversized:
+            self.files = self.files.copy()
+            self.files.pop('image', None)
+
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        # Для новой загрузки ImageField уже прочитал заголовок в image.image
+        header = getattr(image, 'image', None)
+        if header is None:
+            return image
+        width, height = header.size
+        if width * height > POST_IMAGE_MAX_PIXELS:
+            raise forms.ValidationError(
+                f'Слишком большое разрешение: {width}x{height}')
+        return downscale_image(image)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if self.image_oversized:
+            self.add_error(
+                'image',
+                f'Файл больше {POST_IMAGE_MAX_SIZE // (1024 * 1024)} МБ'
+            )
+        return cleaned_data
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,60 @@
+"""Реестр групп в кеше: группа по slug и список для выбора в форме.
+
+Групп тысячи, а меняются они редко, поэтому страница группы и форма
+поста не читают таблицу групп. Данные лежат в кеше под версией области
+groups, которую меняют сохранение и удаление группы (signals) и импорт.
+Счётчик posts_count меняется без сигналов, поэтому он в кеш не попадает
+и при обращении читается из базы.
+"""
+from django.core.cache import cache
+from django.forms.models import ModelChoiceIterator
+
+from yatube.settings import GROUPS_CACHE_TIMEOUT
+
+from .cache import get_versions
+from .models import Group
+
+GROUP_KEY = 'groups:slug:{}:{}'
+CHOICES_KEY = 'groups:choices:{}'
+
+_missing = object()
+
+
+def get_group(slug):
+    """Группа по slug или None, если её нет."""
+    version, = get_versions('groups')
+    key = GROUP_KEY.format(version, slug)
+    group = cache.get(key, _missing)
+    if group is _missing:
+        # Отсутствие группы тоже запоминается: ссылки на удалённые
+        # группы не должны каждый раз доходить до базы
+        group = Group.objects.defer('posts_count').filter(slug=slug).first()
+        cache.set(key, group, GROUPS_CACHE_TIMEOUT)
+    return group
+
+
+def group_choices():
+    """Пары (id, название) всех групп в порядке id."""
+    version, = get_versions('groups')
+    key = CHOICES_KEY.format(version)
+    choices = cache.get(key)
+    if choices is None:
+        choices = list(Group.objects.order_by('id').values_list('id', 'title'))
+        cache.set(key, choices, GROUPS_CACHE_TIMEOUT)
+    return choices
+
+
+class GroupChoiceIterator(ModelChoiceIterator):
+    """Варианты поля группы из реестра, а не из запроса к базе."""
+
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ('', self.field.empty_label)
+        for group_id, title in group_choices():
+            yield self.choice(Group(id=group_id, title=title))
+
+    def __len__(self):
+        return len(group_choices()) + (self.field.empty_label is not None)
+
+    def __bool__(self):
+        return self.field.empty_label is not None or bool(group_choices())
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from posts.cache import bump
+from posts.models import Post, make_excerpt
+
+
+class Command(BaseCommand):
+    help = 'Заполняет отрывки постов, которые показываются в лентах'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Пересчитать все отрывки, например после смены '
+                 'EXCERPT_WORDS',
+        )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.order_by('id').only('id', 'text')
+        if not options['all']:
+            posts = posts.filter(excerpt='')
+        updated = 0
+        last_id = 0
+        while True:
+            # Шаг по id, а не по пустому отрывку: у пустого поста
+            # отрывок так и останется пустым
+            batch = list(posts.filter(id__gt=last_id)[:options['batch_size']])
+            if not batch:
+                break
+            for post in batch:
+                post.excerpt = make_excerpt(post.text)
+            Post.objects.bulk_update(batch, ['excerpt'])
+            bump(*(f'post:{post.id}' for post in batch))
+            updated += len(batch)
+            last_id = batch[-1].id
+        self.stdout.write(self.style.SUCCESS(f'Обновлено отрывков: {updated}'))
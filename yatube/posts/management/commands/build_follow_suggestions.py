@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from posts.follows import build_suggestions
+from posts.models import User
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает рекомендации «кого почитать» для всех пользователей'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        user_ids = User.objects.order_by('id').values_list('id', flat=True)
+        batch = []
+        total = 0
+        for user_id in user_ids.iterator(chunk_size=options['batch_size']):
+            batch.append(user_id)
+            if len(batch) >= options['batch_size']:
+                total += build_suggestions(batch)
+                batch = []
+        if batch:
+            total += build_suggestions(batch)
+        self.stdout.write(self.style.SUCCESS(f'Рекомендаций: {total}'))
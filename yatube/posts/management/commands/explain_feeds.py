@@ -0,0 +1,89 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from yatube.settings import COUNT_POST_VIEWS
+
+from posts.feed import TIMELINE_ORDERING, get_feed
+from posts.models import Comment, Post
+from posts.utils import COMMENT_ORDERING, FEED_ORDERING, CursorPaginator
+
+# План запроса не зависит от данных, поэтому подойдёт любой id
+SAMPLE_ID = 1
+
+
+def view_querysets():
+    """Запросы представлений и сортировка, с которой их листают."""
+    return {
+        'index': (Post.objects.for_feed(), FEED_ORDERING),
+        'group_posts': (
+            Post.objects.for_feed().filter(group_id=SAMPLE_ID),
+            FEED_ORDERING,
+        ),
+        'profile': (
+            Post.objects.for_feed().filter(author_id=SAMPLE_ID),
+            FEED_ORDERING,
+        ),
+        'post_detail': (
+            Comment.objects.select_related('author').filter(
+                post_id=SAMPLE_ID),
+            COMMENT_ORDERING,
+        ),
+        'follow_index': (get_feed(SAMPLE_ID), TIMELINE_ORDERING),
+    }
+
+
+def plans(queryset, ordering):
+    """Планы постраничного запроса и запросов по курсору.
+
+    Порядок тот же, что у get_paginator в представлениях.
+    """
+    yield 'page', queryset.order_by(*ordering)[:COUNT_POST_VIEWS].explain()
+    paginator = CursorPaginator(queryset, COUNT_POST_VIEWS, ordering)
+    cursor = (timezone.now(), SAMPLE_ID)
+    yield 'after', paginator.page_queryset(cursor, True).explain()
+    yield 'before', paginator.page_queryset(cursor, False).explain()
+
+
+def is_full_scan(line, vendor):
+    """Строка плана с перебором всей таблицы или сортировкой без индекса."""
+    if vendor == 'sqlite':
+        return (
+            'SCAN ' in line and 'INDEX' not in line
+            or 'TEMP B-TREE' in line
+        )
+    return 'Seq Scan' in line or 'Sort  (' in line
+
+
+class Command(BaseCommand):
+    help = 'Показывает планы запросов лент и находит полные сканирования'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fail-on-scan',
+            action='store_true',
+            help='Завершиться с ошибкой, если найдено полное сканирование',
+        )
+
+    def handle(self, *args, **options):
+        vendor = connection.vendor
+        failures = {}
+        for view, (queryset, ordering) in view_querysets().items():
+            for mode, plan in plans(queryset, ordering):
+                name = f'{view} ({mode})'
+                self.stdout.write(self.style.MIGRATE_HEADING(name))
+                self.stdout.write(plan)
+                problems = [
+                    line.strip() for line in plan.splitlines()
+                    if is_full_scan(line, vendor)
+                ]
+                if problems:
+                    failures[name] = problems
+                    self.stdout.write(self.style.WARNING(
+                        f'Полное сканирование: {"; ".join(problems)}'))
+        if failures and options['fail_on_scan']:
+            raise CommandError(
+                f'Запросы без индекса: {", ".join(failures)}')
+        if not failures:
+            self.stdout.write(
+                self.style.SUCCESS('Все запросы идут по индексам'))
@@ -0,0 +1,71 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = 'Выгружает группы, посты, комментарии или подписки'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', choices=sorted(transfer.MODELS),
+                            default='posts')
+        parser.add_argument('--format', choices=transfer.FORMATS,
+                            help='По умолчанию — по расширению файла')
+        parser.add_argument('--output', default='-',
+                            help='Путь к файлу или - для stdout')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument(
+            '--checkpoint',
+            help='Файл позиции для продолжения; по умолчанию '
+                 'OUTPUT.checkpoint',
+        )
+        parser.add_argument('--restart', action='store_true',
+                            help='Начать сначала, не глядя на checkpoint')
+
+    def handle(self, *args, **options):
+        path = options['output']
+        to_stdout = path == '-'
+        checkpoint = options['checkpoint']
+        if checkpoint is None and not to_stdout:
+            checkpoint = f'{path}.checkpoint'
+        state = None if options['restart'] else transfer.read_checkpoint(
+            checkpoint)
+        if state and to_stdout:
+            raise CommandError('Продолжить можно только выгрузку в файл')
+        if state and state['model'] != options['model']:
+            raise CommandError(
+                f'{checkpoint} относится к выгрузке {state["model"]}')
+        after_id = state['last_id'] if state else 0
+        file_format = transfer.format_for(path, options['format'])
+        fields = list(transfer.EXPORT_FIELDS[options['model']])
+        if to_stdout:
+            file = self.stdout
+        else:
+            file = open(path, 'r+' if state else 'w', newline='')
+            if state:
+                # Всё, что записано после последней отметки, пишется заново
+                file.seek(state['offset'])
+                file.truncate()
+        exported = 0
+        try:
+            writer = transfer.RecordWriter(
+                file, file_format, fields, header=not state)
+            for record in transfer.export_records(
+                    options['model'], after_id, options['chunk_size']):
+                writer.write(record)
+                exported += 1
+                if checkpoint and exported % options['chunk_size'] == 0:
+                    file.flush()
+                    transfer.write_checkpoint(checkpoint, {
+                        'model': options['model'],
+                        'last_id': record['id'],
+                        'offset': file.tell(),
+                    })
+        finally:
+            if not to_stdout:
+                file.close()
+        if checkpoint and os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        self.stderr.write(f'Выгружено: {exported}')
@@ -0,0 +1,74 @@
+import os
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import transfer
+from posts.counters import reconcile_counters
+
+
+class Command(BaseCommand):
+    help = 'Импортирует группы, посты, комментарии или подписки'
+
+    def add_arguments(self, parser):
+        parser.add_argument('file', help='Путь к файлу или - для stdin')
+        parser.add_argument('--model', choices=sorted(transfer.MODELS),
+                            default='posts')
+        parser.add_argument('--format', choices=transfer.FORMATS,
+                            help='По умолчанию — по расширению файла')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--checkpoint',
+            help='Файл позиции для продолжения; по умолчанию FILE.checkpoint',
+        )
+        parser.add_argument('--restart', action='store_true',
+                            help='Начать сначала, не глядя на checkpoint')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Проверить записи, ничего не сохраняя')
+        parser.add_argument('--create-users', action='store_true',
+                            help='Создавать неизвестных пользователей')
+
+    def handle(self, *args, **options):
+        path = options['file']
+        from_stdin = path == '-'
+        checkpoint = options['checkpoint']
+        if checkpoint is None and not from_stdin:
+            checkpoint = f'{path}.checkpoint'
+        if options['dry_run']:
+            checkpoint = None
+        state = None if options['restart'] else transfer.read_checkpoint(
+            checkpoint)
+        if state and state['model'] != options['model']:
+            raise CommandError(
+                f'{checkpoint} относится к импорту {state["model"]}')
+        start = state['position'] if state else 0
+        importer = transfer.Importer(
+            options['model'], options['dry_run'], options['create_users'])
+        file_format = transfer.format_for(path, options['format'])
+        file = sys.stdin if from_stdin else open(path, newline='')
+        imported = 0
+        try:
+            records = transfer.read_records(file, file_format)
+            for batch in transfer.batches(
+                    records, options['batch_size'], start):
+                imported += importer.import_batch(batch)
+                if checkpoint:
+                    transfer.write_checkpoint(checkpoint, {
+                        'model': options['model'],
+                        'position': max(batch) + 1,
+                    })
+        finally:
+            if not from_stdin:
+                file.close()
+        if not options['dry_run']:
+            reconcile_counters()
+        if checkpoint and os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        for number, reason in importer.skipped[:20]:
+            self.stderr.write(f'Запись {number}: {reason}')
+        verb = 'Проверено' if options['dry_run'] else 'Импортировано'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb}: {imported}, пропущено: {len(importer.skipped)}'
+            + (f', уже были: {importer.existing}' if importer.existing
+               else '')
+            + (f', продолжено с записи {start}' if start else '')))
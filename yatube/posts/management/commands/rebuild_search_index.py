@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import PostSearchTerm
+from posts.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Строит заново поисковый индекс постов'
+
+    def handle(self, *args, **options):
+        rebuild_index()
+        total = PostSearchTerm.objects.count()
+        self.stdout.write(self.style.SUCCESS(f'Записей в индексе: {total}'))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from posts.counters import reconcile_counters
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики постов и комментариев'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать расхождения, ничего не меняя',
+        )
+
+    def handle(self, *args, **options):
+        fixed = reconcile_counters(dry_run=options['dry_run'])
+        for counter, total in fixed.items():
+            self.stdout.write(f'{counter}: {total}')
+        if not any(fixed.values()):
+            self.stdout.write(self.style.SUCCESS('Расхождений нет'))
@@ -0,0 +1,88 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import benchmark
+
+
+class Command(BaseCommand):
+    help = 'Нагрузочный прогон страниц и API с отчётом по задержкам'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--views', nargs='+', choices=sorted(benchmark.TARGETS),
+            default=list(benchmark.TARGETS),
+        )
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Запросов на каждое представление')
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument(
+            '--url', default=None,
+            help='Адрес запущенного сервера; без него — тестовый клиент',
+        )
+        parser.add_argument('--save', metavar='FILE',
+                            help='Сохранить результаты как эталон')
+        parser.add_argument('--compare', metavar='FILE',
+                            help='Сравнить с сохранённым эталоном')
+        parser.add_argument(
+            '--max-regression', type=float, default=None,
+            help='Ошибка, если p95 вырос больше чем на столько процентов',
+        )
+
+    def handle(self, *args, **options):
+        sample = benchmark.pick_sample()
+        if sample is None or sample['group'] is None:
+            raise CommandError(
+                'Нет данных для прогона, сначала выполните seed_data')
+        results = benchmark.run(
+            sample, options['views'], options['requests'],
+            options['concurrency'], options['url'],
+        )
+        self.report(results)
+        if options['save']:
+            with open(options['save'], 'w') as file:
+                json.dump({
+                    'requests': options['requests'],
+                    'concurrency': options['concurrency'],
+                    'url': options['url'],
+                    'views': results,
+                }, file, indent=2)
+        if options['compare']:
+            with open(options['compare']) as file:
+                baseline = json.load(file)['views']
+            self.check_regressions(
+                benchmark.compare(baseline, results),
+                options['max_regression'],
+            )
+
+    def report(self, results):
+        self.stdout.write(
+            f'{"view":<18}{"req/s":>9}{"p50 ms":>9}{"p95 ms":>9}'
+            f'{"p99 ms":>9}{"queries":>9}{"bytes":>9}{"ser ms":>8}'
+            f'{"errors":>8}')
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name:<18}{result["rps"]:>9.1f}{result["p50_ms"]:>9.1f}'
+                f'{result["p95_ms"]:>9.1f}{result["p99_ms"]:>9.1f}'
+                f'{self.optional(result["queries"], 9, ".1f")}'
+                f'{self.optional(result["bytes"], 9, ".0f")}'
+                f'{self.optional(result["serialize_ms"], 8, ".2f")}'
+                f'{result["errors"]:>8}')
+
+    @staticmethod
+    def optional(value, width, spec):
+        return f'{"-" if value is None else format(value, spec):>{width}}'
+
+    def check_regressions(self, changes, max_regression):
+        failed = []
+        for name, change in changes.items():
+            self.stdout.write(
+                f'{name:<18}p95 {change.get("p95_ms", 0):+.1f}%  '
+                f'req/s {change.get("rps", 0):+.1f}%')
+            if (max_regression is not None
+                    and change.get('p95_ms', 0) > max_regression):
+                failed.append(name)
+        if failed:
+            raise CommandError(
+                f'p95 вырос больше чем на {max_regression}%: '
+                f'{", ".join(failed)}')
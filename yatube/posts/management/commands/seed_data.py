@@ -0,0 +1,121 @@
+import random
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from faker import Faker
+
+from posts.counters import reconcile_counters
+from posts.feed import backfill_feed
+from posts.models import Comment, Follow, Group, Post, User, make_excerpt
+from posts.search import index_posts
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = 'Заполняет базу синтетическими данными для нагрузочных тестов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--groups', type=int, default=10)
+        parser.add_argument('--posts', type=int, default=1000)
+        parser.add_argument('--comments', type=int, default=3000)
+        parser.add_argument('--follows', type=int, default=10,
+                            help='Подписок на каждого пользователя')
+        parser.add_argument('--days', type=int, default=365,
+                            help='За сколько дней разбросать посты')
+        parser.add_argument('--password', default='benchmark')
+        parser.add_argument('--seed', type=int, default=None)
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.fake = Faker('ru_RU')
+        self.fake.seed_instance(options['seed'])
+        with transaction.atomic():
+            users = self.create_users(options['users'], options['password'])
+            groups = self.create_groups(options['groups'])
+            posts = self.create_posts(
+                options['posts'], users, groups, options['days'])
+            self.create_comments(options['comments'], users, posts)
+            follows = self.create_follows(options['follows'], users)
+        # bulk_create обходит сигналы, поэтому производные данные
+        # собираются отдельно, как после импорта
+        index_posts(posts)
+        for user_id, author_id in follows:
+            backfill_feed(user_id, author_id)
+        reconcile_counters()
+        cache.clear()
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано: пользователей {len(users)}, групп {len(groups)}, '
+            f'постов {len(posts)}, подписок {len(follows)}'))
+
+    def create_users(self, total, password):
+        password = make_password(password)
+        start = User.objects.count()
+        User.objects.bulk_create(
+            [User(username=f'{self.fake.user_name()}_{start + i}',
+                  first_name=self.fake.first_name(),
+                  last_name=self.fake.last_name(),
+                  password=password)
+             for i in range(total)],
+            batch_size=BATCH_SIZE,
+        )
+        return list(User.objects.order_by('-id')[:total])
+
+    def create_groups(self, total):
+        start = Group.objects.count()
+        Group.objects.bulk_create(
+            [Group(title=self.fake.sentence(nb_words=3)[:200],
+                   slug=f'group-{start + i}',
+                   description=self.fake.paragraph())
+             for i in range(total)],
+            batch_size=BATCH_SIZE,
+        )
+        return list(Group.objects.order_by('-id')[:total])
+
+    def create_posts(self, total, users, groups, days):
+        now = timezone.now()
+        texts = [self.fake.text(max_nb_chars=600) for _ in range(total)]
+        Post.objects.bulk_create(
+            [Post(author=self.random.choice(users),
+                  group=self.random.choice(groups + [None]),
+                  text=text, excerpt=make_excerpt(text))
+             for text in texts],
+            batch_size=BATCH_SIZE,
+        )
+        # auto_now_add ставит всем одну дату, разносим её явно
+        posts = list(Post.objects.order_by('-id')[:total])
+        for post in posts:
+            post.pub_date = now - timedelta(
+                seconds=self.random.randint(0, days * 24 * 60 * 60))
+        Post.objects.bulk_update(posts, ['pub_date'], batch_size=BATCH_SIZE)
+        return posts
+
+    def create_comments(self, total, users, posts):
+        Comment.objects.bulk_create(
+            [Comment(post=self.random.choice(posts),
+                     author=self.random.choice(users),
+                     text=self.fake.sentence())
+             for _ in range(total)],
+            batch_size=BATCH_SIZE,
+        )
+
+    def create_follows(self, per_user, users):
+        authors = [user.id for user in users]
+        pairs = set()
+        for user in users:
+            for author_id in self.random.sample(
+                    authors, min(per_user, len(authors))):
+                if author_id != user.id:
+                    pairs.add((user.id, author_id))
+        Follow.objects.bulk_create(
+            [Follow(user_id=user_id, author_id=author_id)
+             for user_id, author_id in pairs],
+            batch_size=BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+        return pairs
@@ -0,0 +1,46 @@
+# Generated by Django 4.1 on 2026-10-18 20:23
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def index_posts(apps, schema_editor):
+    from posts.search import MAX_WEIGHT, terms
+
+    Post = apps.get_model('posts', 'Post')
+    PostSearchTerm = apps.get_model('posts', 'PostSearchTerm')
+    entries = []
+    for post in Post.objects.only('id', 'text').iterator(chunk_size=1000):
+        entries.extend(
+            PostSearchTerm(post_id=post.id, term=term,
+                           weight=min(weight, MAX_WEIGHT))
+            for term, weight in terms(post.text).items()
+        )
+        if len(entries) >= 1000:
+            PostSearchTerm.objects.bulk_create(entries)
+            entries = []
+    PostSearchTerm.objects.bulk_create(entries)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostSearchTerm',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64, verbose_name='Основа слова')),
+                ('weight', models.PositiveSmallIntegerField(verbose_name='Число вхождений')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='posts.post')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='postsearchterm',
+            constraint=models.UniqueConstraint(fields=('term', 'post'), name='unique_search_term'),
+        ),
+        migrations.RunPython(index_posts, migrations.RunPython.noop),
+    ]
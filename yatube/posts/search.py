@@ -0,0 +1,113 @@
+import math
+import re
+from collections import Counter
+
+from django.core.cache import cache
+from django.db.models import Case, Count, F, FloatField, Sum, When
+
+from yatube.settings import SEARCH_BATCH_SIZE
+
+from .models import Post, PostSearchTerm
+from .stemmer import stem
+
+WORD_RE = re.compile(r'\w+')
+MAX_TERM_LENGTH = 64
+MAX_WEIGHT = 32767
+STOP_WORDS = frozenset((
+    'и', 'в', 'во', 'не', 'что', 'он', 'на', 'я', 'с', 'со', 'как', 'а',
+    'то', 'все', 'она', 'так', 'его', 'но', 'да', 'ты', 'к', 'у', 'же',
+    'вы', 'за', 'бы', 'по', 'только', 'ее', 'мне', 'было', 'вот', 'от',
+    'меня', 'еще', 'нет', 'о', 'из', 'ему', 'ли', 'если', 'или', 'ни',
+    'быть', 'был', 'до', 'вас', 'уже', 'для', 'мы', 'их', 'это', 'при',
+))
+POSTS_TOTAL_KEY = 'search:posts_total'
+
+
+def terms(text):
+    """Основы слов текста с числом вхождений."""
+    words = WORD_RE.findall(text.lower().replace('ё', 'е'))
+    return Counter(
+        stem(word)[:MAX_TERM_LENGTH] for word in words
+        if word not in STOP_WORDS
+    )
+
+
+def _entries(post_id, text):
+    return [
+        PostSearchTerm(post_id=post_id, term=term,
+                       weight=min(weight, MAX_WEIGHT))
+        for term, weight in terms(text).items()
+    ]
+
+
+def index_post(post):
+    """Переиндексирует один пост."""
+    PostSearchTerm.objects.filter(post_id=post.id).delete()
+    PostSearchTerm.objects.bulk_create(
+        _entries(post.id, post.text), batch_size=SEARCH_BATCH_SIZE)
+
+
+def index_posts(posts):
+    """Индексирует пачку постов, ещё не попавших в индекс."""
+    entries = []
+    for post in posts:
+        entries.extend(_entries(post.id, post.text))
+        if len(entries) >= SEARCH_BATCH_SIZE:
+            PostSearchTerm.objects.bulk_create(
+                entries, ignore_conflicts=True)
+            entries = []
+    PostSearchTerm.objects.bulk_create(entries, ignore_conflicts=True)
+
+
+def rebuild_index():
+    PostSearchTerm.objects.all().delete()
+    posts = Post.objects.only('id', 'text').order_by()
+    index_posts(posts.iterator(chunk_size=SEARCH_BATCH_SIZE))
+
+
+def query_terms(query):
+    return list(terms(query))
+
+
+def matching_post_ids(query_stems):
+    """id постов, в которых есть все основы запроса."""
+    return PostSearchTerm.objects.filter(term__in=query_stems).values(
+        'post').annotate(matched=Count('term')).filter(
+        matched=len(query_stems)).values('post')
+
+
+def _idf(query_stems):
+    total = cache.get_or_set(POSTS_TOTAL_KEY, Post.objects.count, 60 * 60)
+    frequencies = dict(
+        PostSearchTerm.objects.filter(term__in=query_stems).values_list(
+            'term').annotate(Count('post')).order_by()
+    )
+    return {
+        term: math.log(1 + total / frequencies.get(term, 1))
+        for term in query_stems
+    }
+
+
+def search_posts(query):
+    """Посты со всеми словами запроса, лучшие совпадения первыми.
+
+    Выборка идёт по индексу основ, поэтому её цена зависит от числа
+    постов со словами запроса, а не от размера всей таблицы.
+    """
+    query_stems = query_terms(query)
+    if not query_stems:
+        return Post.objects.none()
+    score = Sum(
+        Case(
+            *[When(search_terms__term=term,
+                   then=F('search_terms__weight') * idf)
+              for term, idf in _idf(query_stems).items()],
+            output_field=FloatField(),
+        )
+    )
+    return Post.objects.for_feed().filter(
+        search_terms__term__in=query_stems
+    ).annotate(
+        matched=Count('search_terms'),
+        score=score,
+    ).filter(matched=len(query_stems)).order_by('-score', '-pub_date', '-id')
@@ -0,0 +1,91 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from jobs.queue import enqueue
+
+from . import cache, counters, feed, follows, search, tasks
+from .models import Comment, Follow, Group, Post
+
+
+def stored_group_id(post):
+    """Группа поста, сохранённая в базе до текущего изменения."""
+    loaded_values = getattr(post, '_loaded_values', {})
+    return loaded_values.get('group_id', post.group_id)
+
+
+def post_scopes(post):
+    """Области кеша, в которых показывается пост."""
+    scopes = {'posts', f'author:{post.author_id}', f'post:{post.id}'}
+    for group_id in (post.group_id, stored_group_id(post)):
+        if group_id is not None:
+            scopes.add(f'group:{group_id}')
+    return scopes
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    if created:
+        enqueue(tasks.fan_out_post, key=f'fan_out_post:{instance.id}',
+                post_id=instance.id)
+        counters.change_author_posts(instance.author_id, 1)
+        if instance.group_id is not None:
+            counters.change_group_posts(instance.group_id, 1)
+    else:
+        old_group_id = stored_group_id(instance)
+        if old_group_id != instance.group_id:
+            if old_group_id is not None:
+                counters.change_group_posts(old_group_id, -1)
+            if instance.group_id is not None:
+                counters.change_group_posts(instance.group_id, 1)
+    loaded_values = getattr(instance, '_loaded_values', {})
+    if created or loaded_values.get('text') != instance.text:
+        search.index_post(instance)
+    cache.bump(*post_scopes(instance))
+    instance._loaded_values = {
+        **loaded_values,
+        'group_id': instance.group_id,
+        'text': instance.text,
+    }
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counters.change_author_posts(instance.author_id, -1)
+    group_id = stored_group_id(instance)
+    if group_id is not None:
+        counters.change_group_posts(group_id, -1)
+    cache.bump(*post_scopes(instance))
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.change_post_comments(instance.post_id, 1)
+    cache.bump(f'post:{instance.post_id}')
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.change_post_comments(instance.post_id, -1)
+    cache.bump(f'post:{instance.post_id}')
+
+
+@receiver([post_save, post_delete], sender=Group)
+def group_changed(sender, instance, **kwargs):
+    cache.bump('groups', f'group:{instance.id}')
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, **kwargs):
+    if created:
+        enqueue(tasks.backfill_feed, user_id=instance.user_id,
+                author_id=instance.author_id)
+        counters.change_follows(instance.user_id, instance.author_id, 1)
+    cache.bump(*follows.follow_scopes(instance))
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    feed.prune_feed(instance.user_id, instance.author_id)
+    counters.change_follows(instance.user_id, instance.author_id, -1)
+    cache.bump(*follows.follow_scopes(instance))
@@ -0,0 +1,68 @@
+"""Фоновые задачи постов для очереди jobs.
+
+Задачи получают id, а не объекты: пока задача ждёт в очереди, пост
+или подписку могут изменить или удалить, поэтому данные читаются
+заново. Счётчики и сброс кеша остаются в самом запросе: они дешёвые,
+а страница, на которую ведёт редирект, должна их уже видеть.
+"""
+from concurrent.futures import wait
+
+from django.db import transaction
+
+from jobs.queue import enqueue, task
+from yatube.settings import JOBS_EAGER
+
+from . import cache, feed
+from .models import Follow, Post
+
+
+@task
+def fan_out_post(post_id):
+    """Раскладывает пост по лентам подписчиков автора."""
+    post = Post.objects.filter(pk=post_id).only(
+        'author_id', 'pub_date').first()
+    if post is None:
+        return
+    feed.fan_out_post(post)
+    # Ленты подписок, собранные до раскладки, поста ещё не видели
+    cache.bump('posts')
+
+
+@task
+def backfill_feed(user_id, author_id):
+    """Добавляет в ленту подписчика последние посты автора."""
+    # Пока задача ждала, от автора могли отписаться
+    if Follow.objects.filter(user_id=user_id, author_id=author_id).exists():
+        feed.backfill_feed(user_id, author_id)
+        cache.bump(f'follow:{user_id}')
+
+
+@task
+def pregenerate_thumbnails(post_id):
+    """Готовит миниатюры картинки поста и ждёт их."""
+    # thumbnails импортирует signals, а signals — этот модуль
+    from . import thumbnails
+
+    post = Post.objects.filter(pk=post_id).only(
+        'image', 'author_id', 'group_id').first()
+    if post is None or not post.image:
+        return
+    futures = thumbnails.pregenerate(post)
+    wait(futures)
+    for future in futures:
+        future.result()
+
+
+def schedule_thumbnails(post):
+    """Миниатюры картинки поста после сохранения.
+
+    С очередью это задача для воркеров. В режиме JOBS_EAGER миниатюры
+    готовит пул потоков процесса, чтобы не задерживать ответ.
+    """
+    if JOBS_EAGER:
+        from . import thumbnails
+
+        transaction.on_commit(lambda: thumbnails.pregenerate(post))
+        return
+    enqueue(pregenerate_thumbnails, key=f'thumbnails:{post.image.name}',
+            post_id=post.id)
@@ -0,0 +1,46 @@
+from django import template
+from django.core.cache import cache
+from django.utils.safestring import mark_safe
+
+from yatube.settings import POST_CARD_CACHE_TIMEOUT
+
+from posts.cache import get_versions
+
+register = template.Library()
+
+CARD_TEMPLATE = 'posts/includes/post_card.html'
+CARD_KEY = 'card:{}:{}:{}'
+
+
+@register.simple_tag(takes_context=True)
+def post_cards(context, posts):
+    """Готовый HTML карточек постов: {% post_cards page_obj as cards %}.
+
+    Карточка не зависит от зрителя и ключуется версией своего поста
+    и версией групп, поэтому при новом посте в ленте остальные
+    карточки страницы берутся готовыми. Версии и карточки читаются
+    из кеша двумя запросами на всю страницу, недостающие рисуются
+    и записываются одним set_many.
+    """
+    posts = list(posts)
+    if not posts:
+        return []
+    groups_version, *versions = get_versions(
+        'groups', *(f'post:{post.id}' for post in posts))
+    keys = [CARD_KEY.format(post.id, version, groups_version)
+            for post, version in zip(posts, versions)]
+    cached = cache.get_many(keys)
+    card_template = context.template.engine.get_template(CARD_TEMPLATE)
+    rendered = {}
+    cards = []
+    for key, post in zip(keys, posts):
+        card = cached.get(key)
+        if card is None:
+            # Новый контекст без переменных страницы: карточка общая
+            # для всех зрителей
+            card = card_template.render(context.new({'post': post}))
+            rendered[key] = card
+        cards.append(mark_safe(card))
+    if rendered:
+        cache.set_many(rendered, POST_CARD_CACHE_TIMEOUT)
+    return cards
@@ -0,0 +1,80 @@
+from django import template
+from django.template import TemplateSyntaxError
+from sorl.thumbnail import get_thumbnail
+from sorl.thumbnail.templatetags.thumbnail import ThumbnailNode, kw_pat
+
+from yatube.settings import THUMBNAIL_ASYNC
+
+from core import perf
+from posts import thumbnails
+from posts.models import Post
+from posts.signals import post_scopes
+
+register = template.Library()
+
+
+class AsyncThumbnailNode(ThumbnailNode):
+    """Тег thumbnail, который не режет картинку внутри запроса.
+
+    Если миниатюры ещё нет, генерация уходит в фоновый пул, а в шаблон
+    попадает заглушка с тем же интерфейсом (url, width, height).
+    """
+    error_msg = ('Syntax error. Expected: ``async_thumbnail source '
+                 'geometry [key1=val1 key2=val2...] as var``')
+
+    def __init__(self, parser, token):
+        bits = token.split_contents()
+        if len(bits) < 5 or bits[-2] != 'as':
+            raise TemplateSyntaxError(self.error_msg)
+        self.file_ = parser.compile_filter(bits[1])
+        self.geometry = parser.compile_filter(bits[2])
+        self.options = []
+        for bit in bits[3:-2]:
+            match = kw_pat.match(bit)
+            if not match:
+                raise TemplateSyntaxError(self.error_msg)
+            value = parser.compile_filter(match.group('value'))
+            self.options.append((match.group('key'), value))
+        self.as_var = bits[-1]
+        self.nodelist_file = parser.parse(('empty', 'endasync_thumbnail'))
+        if parser.next_token().contents == 'empty':
+            self.nodelist_empty = parser.parse(('endasync_thumbnail',))
+            parser.delete_first_token()
+
+    def _render(self, context):
+        file_ = self.file_.resolve(context)
+        if not file_:
+            if self.nodelist_empty:
+                return self.nodelist_empty.render(context)
+            return ''
+        geometry = self.geometry.resolve(context)
+        options = {}
+        for key, expr in self.options:
+            noresolve = {'True': True, 'False': False, 'None': None}
+            value = noresolve.get(str(expr), expr.resolve(context))
+            if key == 'options':
+                options.update(value)
+            else:
+                options[key] = value
+        with perf.timer('thumbnail'):
+            if THUMBNAIL_ASYNC:
+                thumbnail = thumbnails.get_ready_thumbnail(
+                    file_, geometry, **options)
+                if thumbnail is None:
+                    instance = getattr(file_, 'instance', None)
+                    scopes = (post_scopes(instance)
+                              if isinstance(instance, Post) else ())
+                    thumbnails.schedule(file_, geometry, scopes, **options)
+                    thumbnail = thumbnails.PlaceholderImage(geometry)
+            else:
+                thumbnail = get_thumbnail(file_, geometry, **options)
+        context.push()
+        context[self.as_var] = thumbnail
+        output = self.nodelist_file.render(context)
+        context.pop()
+        return output
+
+
+@register.tag
+def async_thumbnail(parser, token):
+    return AsyncThumbnailNode(parser, token)
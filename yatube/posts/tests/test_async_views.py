@@ -0,0 +1,74 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.http import Http404
+from django.test import AsyncRequestFactory, TestCase
+
+from .. import async_views
+from ..models import Follow, Group, Post
+
+User = get_user_model()
+
+
+class AsyncViewsTests(TestCase):
+    """Класс тестирования асинхронных вариантов страниц"""
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='test-slug', description='Описание')
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Асинхронный пост')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.factory = AsyncRequestFactory()
+
+    def make_request(self, user=None):
+        request = self.factory.get('/')
+        request.user = user or AnonymousUser()
+        return request
+
+    async def test_pages(self):
+        """Асинхронные страницы показывают те же посты"""
+        pages = (
+            (async_views.index, {}),
+            (async_views.group_posts, {'slug': self.group.slug}),
+            (async_views.profile, {'username': self.author.username}),
+            (async_views.post_detail, {'post_id': self.post.id}),
+        )
+        for user in (None, self.reader):
+            for view, kwargs in pages:
+                with self.subTest(view=view.__name__, user=user):
+                    response = await view(self.make_request(user), **kwargs)
+                    self.assertContains(response, self.post.text)
+                    self.assertIn('ETag', response)
+
+    async def test_follow_index(self):
+        """Лента подписок требует входа и показывает посты авторов"""
+        response = await async_views.follow_index(self.make_request())
+        self.assertEqual(response.status_code, 302)
+        response = await async_views.follow_index(
+            self.make_request(self.reader))
+        self.assertContains(response, self.post.text)
+
+    async def test_missing_objects(self):
+        """Несуществующие группа, автор и пост дают 404"""
+        calls = (
+            (async_views.group_posts, {'slug': 'missing'}),
+            (async_views.profile, {'username': 'missing'}),
+            (async_views.post_detail, {'post_id': 0}),
+        )
+        for view, kwargs in calls:
+            with self.subTest(view=view.__name__):
+                with self.assertRaises(Http404):
+                    await view(self.make_request(), **kwargs)
+
+    async def test_anonymous_page_cache(self):
+        """Кеш страниц для гостей работает и в асинхронном варианте"""
+        response = await async_views.index(self.make_request())
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        response = await async_views.index(self.make_request())
+        self.assertEqual(response['X-Page-Cache'], 'hit')
@@ -1,9 +1,18 @@
+import hashlib
+
+from django import forms
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.test import Client, TestCase
 from django.urls import reverse
 
-from ..models import Post
+from yatube.settings import COUNT_POST_VIEWS
+
+from ..cache import PAGE_LOCK_KEY
+from ..forms import PostForm
+from ..groups import get_group
+from ..models import Group, Post
 
 User = get_user_model()
 
@@ -19,12 +28,16 @@ class PostViewsTests(TestCase):
         )
 
     def setUp(self):
+        cache.clear()
         self.authorized_client = Client()
         self.authorized_client.force_login(self.user)
 
     def test_cache_page(self):
+        """Лента берётся из кеша, пока посты не менялись"""
         response = self.authorized_client.get(reverse('posts:index')).content
-        self.post_cash.delete()
+        # Лента показывает сохранённый отрывок, update() меняет его явно
+        Post.objects.filter(pk=self.post_cash.pk).update(
+            text='Обновлено', excerpt='Обновлено')
         response_cache = self.authorized_client.get(
             reverse('posts:index')).content
         self.assertEqual(response, response_cache)
@@ -32,3 +45,226 @@ class PostViewsTests(TestCase):
         response_clear = self.authorized_client.get(
             reverse('posts:index')).content
         self.assertNotEqual(response, response_clear)
+
+    def test_cache_invalidated_on_change(self):
+        """Новый и удалённый пост сразу видны в ленте"""
+        url = reverse('posts:index')
+        self.authorized_client.get(url)
+        new_post = Post.objects.create(author=self.user, text='Свежий пост')
+        self.assertContains(self.authorized_client.get(url), new_post.text)
+        new_post.delete()
+        self.assertNotContains(self.authorized_client.get(url), new_post.text)
+
+    def test_cache_per_page(self):
+        """Каждая страница ленты кешируется отдельно"""
+        for i in range(COUNT_POST_VIEWS):
+            Post.objects.create(author=self.user, text=f'Пост {i}')
+        url = reverse('posts:index')
+        self.authorized_client.get(url)
+        response = self.authorized_client.get(url, {'page': 2})
+        self.assertContains(response, self.post_cash.text)
+
+
+class ConditionalGetTests(TestCase):
+    """Класс тестирования условных GET-запросов"""
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(author=cls.user, text='Пост')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_not_modified_until_change(self):
+        """Страницы отвечают 304, пока их данные не менялись"""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:profile', args=[self.user.username]),
+            reverse('posts:post_detail', args=[self.post.id]),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertIn('Cookie', response['Vary'])
+                etag = response['ETag']
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.post.text = f'Правка для {url}'
+                self.post.save()
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    def test_etag_depends_on_viewer(self):
+        """Гость и вошедший пользователь получают разные ETag"""
+        url = reverse('posts:index')
+        etag = self.client.get(url)['ETag']
+        self.client.force_login(self.user)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Last-Modified', response)
+
+    def test_etag_depends_on_csrf_secret(self):
+        """Страница с формой и старым CSRF-токеном не подтверждается 304"""
+        url = reverse('posts:post_detail', args=[self.post.id])
+        self.client.force_login(self.user)
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.client.cookies[settings.CSRF_COOKIE_NAME] = 'a' * 32
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_last_modified_for_guests(self):
+        """Гостю отвечают 304 по дате последнего изменения"""
+        url = reverse('posts:index')
+        last_modified = self.client.get(url)['Last-Modified']
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+
+class AnonymousPageCacheTests(TestCase):
+    """Класс тестирования кеша целых страниц для гостей"""
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(author=cls.user, text='Пост')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_guest_page_served_from_cache(self):
+        """Повторная страница гостю отдаётся из кеша без базы"""
+        url = reverse('posts:index')
+        response = self.client.get(url)
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+        self.assertContains(response, self.post.text)
+
+    def test_query_string_in_key(self):
+        """Страницы с разными параметрами кешируются отдельно"""
+        url = reverse('posts:index')
+        self.client.get(url)
+        response = self.client.get(url, {'page': 1})
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+
+    def test_purged_on_change(self):
+        """Изменение поста сразу пересобирает страницу"""
+        url = reverse('posts:profile', args=[self.user.username])
+        self.client.get(url)
+        self.post.text = 'Новый текст'
+        self.post.save()
+        response = self.client.get(url)
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertContains(response, 'Новый текст')
+
+    def test_stale_while_rebuilding(self):
+        """Пока страницу пересобирает другой процесс, гость видит копию"""
+        url = reverse('posts:index')
+        self.client.get(url)
+        Post.objects.create(author=self.user, text='Свежий пост')
+        path_hash = hashlib.md5(url.encode()).hexdigest()
+        cache.add(PAGE_LOCK_KEY.format(path_hash), 1)
+        response = self.client.get(url)
+        self.assertEqual(response['X-Page-Cache'], 'stale')
+        self.assertNotContains(response, 'Свежий пост')
+
+    def test_stale_copy_has_no_validators(self):
+        """Устаревшая копия не получает ETag свежих версий и 304"""
+        url = reverse('posts:index')
+        etag = self.client.get(url)['ETag']
+        Post.objects.create(author=self.user, text='Свежий пост')
+        path_hash = hashlib.md5(url.encode()).hexdigest()
+        cache.add(PAGE_LOCK_KEY.format(path_hash), 1)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Page-Cache'], 'stale')
+        self.assertFalse(response.has_header('ETag'))
+        self.assertFalse(response.has_header('Last-Modified'))
+        self.assertIn('no-store', response['Cache-Control'])
+        cache.delete(PAGE_LOCK_KEY.format(path_hash))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Свежий пост')
+
+    def test_not_cached_for_users(self):
+        """Вошедшему пользователю страница не отдаётся из кеша гостей"""
+        url = reverse('posts:index')
+        self.client.get(url)
+        self.client.force_login(self.user)
+        self.assertNotIn('X-Page-Cache', self.client.get(url))
+
+
+class PostCardCacheTests(TestCase):
+    """Класс тестирования кеша карточек постов"""
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(author=cls.user, text='Старый текст')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def test_cards_reused_across_pages(self):
+        """Готовая карточка берётся из кеша и на другой странице"""
+        self.client.get(reverse('posts:index'))
+        Post.objects.filter(pk=self.post.pk).update(text='Без сигналов')
+        response = self.client.get(
+            reverse('posts:profile', args=[self.user.username]))
+        self.assertContains(response, 'Старый текст')
+
+    def test_new_post_keeps_other_cards(self):
+        """Новый пост рисует только свою карточку"""
+        self.client.get(reverse('posts:index'))
+        Post.objects.filter(pk=self.post.pk).update(text='Без сигналов')
+        Post.objects.create(author=self.user, text='Свежий пост')
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Свежий пост')
+        self.assertContains(response, 'Старый текст')
+
+    def test_card_updated_on_edit(self):
+        """Правка поста сразу меняет его карточку"""
+        self.client.get(reverse('posts:index'))
+        self.post.text = 'Новый текст'
+        self.post.save()
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Новый текст')
+
+
+class GroupRegistryTests(TestCase):
+    """Класс тестирования реестра групп"""
+    @classmethod
+    def setUpTestData(cls):
+        cls.group = Group.objects.create(
+            title='Коты', slug='cats', description='Про котов')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_group_by_slug(self):
+        """Группа по slug читается из кеша и обновляется при изменении"""
+        self.assertEqual(get_group('cats'), self.group)
+        self.assertIsNone(get_group('dogs'))
+        with self.assertNumQueries(0):
+            self.assertEqual(get_group('cats').title, 'Коты')
+            self.assertIsNone(get_group('dogs'))
+        Group.objects.create(title='Собаки', slug='dogs', description='')
+        self.assertEqual(get_group('dogs').title, 'Собаки')
+        self.group.title = 'Кошки'
+        self.group.save()
+        self.assertEqual(get_group('cats').title, 'Кошки')
+        self.group.delete()
+        self.assertIsNone(get_group('cats'))
+
+    def test_form_choices_from_cache(self):
+        """Варианты группы в форме поста не читают базу"""
+        str(PostForm()['group'])
+        form = PostForm()
+        self.assertIsInstance(form.fields['group'], forms.ModelChoiceField)
+        with self.assertNumQueries(0):
+            html = str(form['group'])
+        self.assertIn(f'<option value="{self.group.id}">Коты</option>', html)
+        Group.objects.create(title='Собаки', slug='dogs', description='')
+        self.assertIn('Собаки', str(PostForm()['group']))
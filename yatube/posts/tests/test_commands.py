@@ -0,0 +1,196 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase
+
+from .. import benchmark
+from ..models import (AuthorStats, Comment, FeedEntry, Follow,
+                      FollowSuggestion, Group, Post, PostSearchTerm, User)
+
+
+class ExplainFeedsCommandTests(TestCase):
+    """Класс тестирования команды explain_feeds"""
+    def test_feed_queries_use_indexes(self):
+        """Запросы лент не перебирают таблицы целиком"""
+        out = StringIO()
+        call_command('explain_feeds', '--fail-on-scan', stdout=out)
+        self.assertIn('post_pub_date_idx', out.getvalue())
+
+
+class BenchmarkCommandsTests(TransactionTestCase):
+    """Класс тестирования генерации данных и нагрузочного прогона"""
+    def test_seed_and_benchmark(self):
+        """Данные создаются со всеми производными, прогон без ошибок"""
+        call_command('seed_data', '--users', 5, '--groups', 2, '--posts', 20,
+                     '--comments', 10, '--follows', 2, '--seed', 1,
+                     stdout=StringIO())
+        self.assertEqual(Post.objects.count(), 20)
+        self.assertEqual(Comment.objects.count(), 10)
+        self.assertTrue(Follow.objects.exists())
+        self.assertTrue(FeedEntry.objects.exists())
+        self.assertTrue(PostSearchTerm.objects.exists())
+        out = StringIO()
+        with tempfile.TemporaryDirectory() as directory:
+            baseline = os.path.join(directory, 'baseline.json')
+            call_command('run_benchmark', '--requests', 2,
+                         '--concurrency', 1, '--save', baseline, stdout=out)
+            # Тестовая база SQLite в памяти блокирует таблицы целиком,
+            # параллельные входы в ней падают на django_session
+            call_command('run_benchmark', '--requests', 2, '--views',
+                         'index', '--concurrency', 1, '--compare', baseline,
+                         stdout=out)
+            with open(baseline) as file:
+                views = json.load(file)['views']
+        self.assertEqual(set(views), set(benchmark.TARGETS))
+        for name, result in views.items():
+            with self.subTest(view=name):
+                self.assertEqual(result['errors'], 0)
+                self.assertGreater(result['queries'], 0)
+                if name.startswith('api_'):
+                    self.assertGreater(result['bytes'], 0)
+                    self.assertIsNotNone(result['serialize_ms'])
+        self.assertIn('p95', out.getvalue())
+
+
+class TransferCommandsTests(TestCase):
+    """Класс тестирования импорта и экспорта"""
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='test-slug', description='Описание')
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Кошки спят')
+        Comment.objects.create(post=cls.post, author=cls.reader, text='Да')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def export(self, model, extension='jsonl'):
+        path = os.path.join(self.directory, f'{model}.{extension}')
+        call_command('export_posts', '--model', model, '--output', path,
+                     stderr=StringIO())
+        return path
+
+    def test_round_trip(self):
+        """Выгруженные данные загружаются обратно со всеми производными"""
+        paths = [self.export('groups', 'csv'), self.export('posts'),
+                 self.export('comments', 'csv'), self.export('follows')]
+        pub_date = self.post.pub_date
+        Group.objects.all().delete()
+        Post.objects.all().delete()
+        Follow.objects.all().delete()
+        for model, path in zip(('groups', 'posts', 'comments', 'follows'),
+                               paths):
+            call_command('import_posts', path, '--model', model,
+                         stdout=StringIO(), stderr=StringIO())
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertEqual(post.pub_date, pub_date)
+        self.assertEqual(post.group.slug, self.group.slug)
+        self.assertEqual(post.comments_count, 1)
+        self.assertTrue(FeedEntry.objects.filter(
+            user=self.reader, post=post).exists())
+        self.assertTrue(post.search_terms.exists())
+        self.assertEqual(post.excerpt, 'Кошки спят')
+        self.assertEqual(AuthorStats.objects.get(
+            user=self.author).followers_count, 1)
+        self.assertEqual(AuthorStats.objects.get(
+            user=self.reader).following_count, 1)
+
+    def test_existing_ids_left_untouched(self):
+        """Запись с уже занятым id не меняет пост и не считается новой"""
+        pub_date = self.post.pub_date
+        path = os.path.join(self.directory, 'posts.jsonl')
+        with open(path, 'w') as file:
+            for record in (
+                {'id': self.post.id, 'author': 'reader',
+                 'text': 'Чужие собаки', 'pub_date': '2001-01-01T00:00:00'},
+                {'author': 'reader', 'text': 'Новый пост'},
+            ):
+                file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        out = StringIO()
+        call_command('import_posts', path, stdout=out)
+        self.assertIn('Импортировано: 1, пропущено: 0, уже были: 1',
+                      out.getvalue())
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertEqual(post.pub_date, pub_date)
+        self.assertEqual(post.text, 'Кошки спят')
+        self.assertFalse(PostSearchTerm.objects.filter(
+            post=post, term__in=('чуж', 'собак')).exists())
+        self.assertTrue(Post.objects.filter(text='Новый пост').exists())
+
+    def test_dry_run_and_unknown_users(self):
+        """Пробный прогон ничего не пишет, неизвестные авторы пропускаются"""
+        path = os.path.join(self.directory, 'posts.jsonl')
+        with open(path, 'w') as file:
+            file.write(json.dumps({'author': 'author', 'text': 'Раз'}) + '\n')
+            file.write(json.dumps({'author': 'ghost', 'text': 'Два'}) + '\n')
+        out = StringIO()
+        call_command('import_posts', path, '--dry-run', stdout=out,
+                     stderr=StringIO())
+        self.assertIn('Проверено: 1, пропущено: 1', out.getvalue())
+        self.assertEqual(Post.objects.count(), 1)
+        call_command('import_posts', path, '--create-users',
+                     stdout=StringIO(), stderr=StringIO())
+        self.assertTrue(Post.objects.filter(author__username='ghost').exists())
+
+    def test_import_resumes_from_checkpoint(self):
+        """Импорт продолжается с позиции из checkpoint"""
+        path = os.path.join(self.directory, 'posts.jsonl')
+        with open(path, 'w') as file:
+            for text in ('Первый', 'Второй', 'Третий'):
+                file.write(
+                    json.dumps({'author': 'author', 'text': text}) + '\n')
+        with open(f'{path}.checkpoint', 'w') as file:
+            json.dump({'model': 'posts', 'position': 2}, file)
+        call_command('import_posts', path, stdout=StringIO())
+        self.assertTrue(Post.objects.filter(text='Третий').exists())
+        self.assertFalse(Post.objects.filter(text='Первый').exists())
+        self.assertFalse(os.path.exists(f'{path}.checkpoint'))
+
+
+class BackfillExcerptsCommandTests(TestCase):
+    """Класс тестирования заполнения отрывков"""
+    def test_fills_empty_and_recomputes_all(self):
+        """Без --all заполняются пустые отрывки, с ним — все"""
+        author = User.objects.create_user(username='author')
+        empty = Post.objects.create(author=author, text='Пустой отрывок')
+        stale = Post.objects.create(author=author, text='Старый отрывок')
+        Post.objects.filter(pk=empty.pk).update(excerpt='')
+        Post.objects.filter(pk=stale.pk).update(excerpt='устарел')
+        out = StringIO()
+        call_command('backfill_excerpts', '--batch-size', 1, stdout=out)
+        self.assertIn('Обновлено отрывков: 1', out.getvalue())
+        self.assertEqual(
+            Post.objects.get(pk=empty.pk).excerpt, 'Пустой отрывок')
+        self.assertEqual(Post.objects.get(pk=stale.pk).excerpt, 'устарел')
+        call_command('backfill_excerpts', '--all', stdout=StringIO())
+        self.assertEqual(
+            Post.objects.get(pk=stale.pk).excerpt, 'Старый отрывок')
+
+
+class FollowSuggestionsCommandTests(TestCase):
+    """Класс тестирования пересчёта рекомендаций"""
+    def test_builds_suggestions_for_all_users(self):
+        """Рекомендации пересчитываются для всех пользователей пачками"""
+        reader, author, popular = (
+            User.objects.create_user(username=username)
+            for username in ('reader', 'author', 'popular'))
+        Follow.objects.create(user=reader, author=author)
+        Follow.objects.create(user=author, author=popular)
+        out = StringIO()
+        call_command('build_follow_suggestions', '--batch-size', 2,
+                     stdout=out)
+        self.assertIn('Рекомендаций: 2', out.getvalue())
+        self.assertEqual(
+            FollowSuggestion.objects.get(user=reader).author, popular)
+        # Без подписок рекомендуются популярные авторы
+        self.assertEqual(
+            FollowSuggestion.objects.get(user=popular).author, author)
@@ -0,0 +1,148 @@
+import json
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+
+from yatube.settings import COMMENTS_PER_PAGE
+
+from .. import cache as post_cache
+from ..comments import CommentBuffer, save_comments
+from ..models import Comment, Post
+
+User = get_user_model()
+
+COMMENTS_TOTAL = COMMENTS_PER_PAGE + 5
+
+
+class CommentsPaginationTests(TestCase):
+    """Класс тестирования постраничных комментариев"""
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+        for i in range(COMMENTS_TOTAL):
+            Comment.objects.create(
+                post=cls.post, author=cls.author, text=f'Комментарий {i}')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_first_page_on_post(self):
+        """На странице поста первая страница комментариев и их число"""
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.post.id]))
+        comments = response.context['comments']
+        self.assertEqual(len(comments), COMMENTS_PER_PAGE)
+        self.assertEqual(comments[0].text, 'Комментарий 0')
+        self.assertTrue(comments.has_next())
+        self.assertContains(response, f'Комментарии: {COMMENTS_TOTAL}')
+        self.assertContains(response, 'data-load-more')
+
+    def test_load_more(self):
+        """Подгрузка отдаёт остаток фрагментом и в JSON"""
+        first = self.client.get(
+            reverse('posts:post_detail', args=[self.post.id]))
+        cursor = first.context['comments'].next_cursor
+        url = reverse('posts:post_comments', args=[self.post.id])
+        response = self.client.get(url, {'after': cursor})
+        self.assertContains(response, f'Комментарий {COMMENTS_TOTAL - 1}')
+        self.assertNotContains(response, 'Комментарий 0\n')
+        self.assertNotContains(response, 'data-load-more')
+        data = json.loads(self.client.get(
+            url, {'after': cursor, 'format': 'json'}).content)
+        self.assertIsNone(data['next'])
+        self.assertEqual(data['html'].count('media-body'), 5)
+
+    def test_load_more_queries(self):
+        """Страница комментариев читается с авторами одним запросом"""
+        url = reverse('posts:post_comments', args=[self.post.id])
+        self.client.get(url)
+        with self.assertNumQueries(2):
+            self.client.get(url, {'format': 'json'})
+
+    def test_missing_post(self):
+        """Подгрузка для несуществующего поста даёт 404"""
+        response = self.client.get(reverse('posts:post_comments', args=[0]))
+        self.assertEqual(response.status_code, 404)
+
+
+class CommentWriteTests(TestCase):
+    """Класс тестирования записи комментариев"""
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+        cls.other_post = Post.objects.create(author=cls.author, text='Другой')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.author)
+
+    def test_missing_post(self):
+        """Комментарий к несуществующему посту даёт 404, а не 500"""
+        response = self.client.post(
+            reverse('posts:add_comment', args=[0]), {'text': 'Текст'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_lean_write(self):
+        """Пост проверяется на существование без чтения его строки"""
+        url = reverse('posts:add_comment', args=[self.post.id])
+        self.client.post(url, {'text': 'Прогрев сессии'})
+        with self.assertNumQueries(7) as context:
+            self.client.post(url, {'text': 'Текст'})
+        post_reads = [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith('SELECT')
+            and 'FROM "posts_post"' in query['sql']
+        ]
+        self.assertEqual(len(post_reads), 1)
+        self.assertIn('SELECT 1 AS "a"', post_reads[0])
+
+    def test_batch_save(self):
+        """Пачка пишется разом, счётчики и кеш меняются по постам"""
+        other_version = post_cache.get_versions(f'post:{self.other_post.id}')
+        comments = [
+            Comment(post_id=post_id, author=self.author, text='Пачка')
+            for post_id in (self.post.id, self.post.id, 0)
+        ]
+        saved = save_comments(comments)
+        self.assertEqual(len(saved), 2)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 2)
+        self.assertEqual(
+            post_cache.get_versions(f'post:{self.other_post.id}'),
+            other_version)
+
+
+class CommentBufferTests(TransactionTestCase):
+    """Класс тестирования буфера комментариев"""
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.post = Post.objects.create(author=self.author, text='Пост')
+
+    def make_comment(self, text):
+        return Comment(post_id=self.post.id, author=self.author, text=text)
+
+    def test_flush_by_size(self):
+        """Полная пачка забирается без ожидания, остаток — по времени"""
+        buffer = CommentBuffer(max_size=2, max_latency=60)
+        buffer.pending = [(time.monotonic(), self.make_comment(str(i)))
+                          for i in range(3)]
+        self.assertEqual(len(buffer.take()), 2)
+        buffer.max_latency = 0
+        self.assertEqual(len(buffer.take()), 1)
+
+    def test_background_flush(self):
+        """Фоновый поток пишет комментарии не позже заданной задержки"""
+        buffer = CommentBuffer(max_size=10, max_latency=0.05)
+        buffer.add(self.make_comment('Из буфера'))
+        deadline = time.monotonic() + 5
+        while (not Comment.objects.exists()
+               and time.monotonic() < deadline):
+            time.sleep(0.02)
+        self.assertTrue(Comment.objects.filter(text='Из буфера').exists())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
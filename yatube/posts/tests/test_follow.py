@@ -1,8 +1,12 @@
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import Client, TestCase
 from django.urls import reverse
 
-from posts.models import Follow, Post
+from posts.counters import reconcile_counters
+from posts.follows import (build_suggestions, following_ids, is_following,
+                           suggested_authors)
+from posts.models import AuthorStats, FeedEntry, Follow, Post
 
 User = get_user_model()
 
@@ -46,3 +50,81 @@ class FollowViewsTest(TestCase):
             author=self.user).delete()
         response = self.authorized_client.get(reverse('posts:follow_index'))
         self.assertNotContains(response, self.post.text)
+
+    def test_feed_entries_fan_out(self):
+        """Посты раскладываются по лентам подписчиков и убираются"""
+        Follow.objects.create(user=self.user_2, author=self.user)
+        self.assertTrue(FeedEntry.objects.filter(
+            user=self.user_2, post=self.post).exists())
+        new_post = Post.objects.create(author=self.user, text='Новый пост')
+        self.assertTrue(FeedEntry.objects.filter(
+            user=self.user_2, post=new_post).exists())
+        Follow.objects.filter(user=self.user_2, author=self.user).delete()
+        self.assertFalse(FeedEntry.objects.filter(user=self.user_2).exists())
+
+
+class FollowGraphTest(TestCase):
+    """Класс тестирования графа подписок"""
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username='reader')
+        cls.authors = [User.objects.create_user(username=f'author{number}')
+                       for number in range(4)]
+
+    def setUp(self):
+        cache.clear()
+
+    def test_is_following_batched_and_cached(self):
+        """Подписки на всех авторов проверяются одним чтением кеша"""
+        first, second, third, _ = self.authors
+        Follow.objects.create(user=self.reader, author=second)
+        Follow.objects.create(user=self.reader, author=first)
+        author_ids = [author.id for author in self.authors]
+        following_ids(self.reader.id)
+        with self.assertNumQueries(0):
+            following = is_following(self.reader, author_ids)
+        self.assertEqual(following, {
+            first.id: True, second.id: True,
+            third.id: False, self.authors[3].id: False,
+        })
+        Follow.objects.create(user=self.reader, author=third)
+        self.assertTrue(is_following(self.reader, [third.id])[third.id])
+        Follow.objects.filter(user=self.reader, author=first).delete()
+        self.assertFalse(is_following(self.reader, [first.id])[first.id])
+
+    def test_follow_counts(self):
+        """Счётчики подписчиков и подписок меняются и сверяются"""
+        author = self.authors[0]
+        Follow.objects.create(user=self.reader, author=author)
+        self.assertEqual(AuthorStats.objects.get(
+            user=author).followers_count, 1)
+        self.assertEqual(AuthorStats.objects.get(
+            user=self.reader).following_count, 1)
+        AuthorStats.objects.filter(user=author).update(followers_count=9)
+        self.assertEqual(reconcile_counters()['authors'], 1)
+        self.assertEqual(AuthorStats.objects.get(
+            user=author).followers_count, 1)
+        client = Client()
+        response = client.get(
+            reverse('posts:profile', args=[author.username]))
+        self.assertEqual(response.context['author_followers_count'], 1)
+        Follow.objects.filter(user=self.reader).delete()
+        response = client.get(
+            reverse('posts:profile', args=[author.username]))
+        self.assertEqual(response.context['author_followers_count'], 0)
+
+    def test_suggestions(self):
+        """Рекомендуются авторы, которых читают те, кого читает пользователь"""
+        first, second, third, popular = self.authors
+        Follow.objects.create(user=self.reader, author=first)
+        Follow.objects.create(user=self.reader, author=second)
+        Follow.objects.create(user=first, author=third)
+        Follow.objects.create(user=first, author=popular)
+        Follow.objects.create(user=second, author=third)
+        build_suggestions([self.reader.id])
+        self.assertEqual(suggested_authors(self.reader), [third, popular])
+        Follow.objects.create(user=self.reader, author=third)
+        client = Client()
+        client.force_login(self.reader)
+        response = client.get(reverse('posts:follow_index'))
+        self.assertEqual(response.context['suggestions'], [popular])
@@ -1,13 +1,20 @@
 import shutil
 import tempfile
+from io import BytesIO
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import Client, TestCase, override_settings
+from django.core.files.uploadhandler import StopUpload
+from django.test import (Client, RequestFactory, TestCase,
+                         override_settings)
 from django.urls import reverse
+from PIL import Image
+
+from yatube.settings import POST_IMAGE_MAX_SIDE
 
 from ..models import Comment, Group, Post
+from ..uploads import LimitedImageUploadHandler
 
 User = get_user_model()
 
@@ -22,6 +29,10 @@ SMALL_GIF = (
 )
 
 
+class TinyLimitUploadHandler(LimitedImageUploadHandler):
+    max_size = 10
+
+
 @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
 class FormTests(TestCase):
     """Класс тестирования Формы"""
@@ -121,3 +132,44 @@ class FormTests(TestCase):
                              f'/auth/login/?next=/posts/'
                              f'{self.post.id}/comment/')
         self.assertEqual(Comment.objects.count(), 0)
+
+    @override_settings(FILE_UPLOAD_HANDLERS=[
+        'posts.tests.test_forms.TinyLimitUploadHandler'])
+    def test_oversized_image_rejected(self):
+        """Файл сверх лимита отклоняется с ошибкой формы"""
+        posts_count = Post.objects.count()
+        uploaded = SimpleUploadedFile(
+            name='small.gif',
+            content=SMALL_GIF,
+            content_type='image/gif'
+        )
+        response = self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Большая картинка', 'image': uploaded})
+        self.assertEqual(Post.objects.count(), posts_count)
+        self.assertTrue(response.context['form'].has_error('image'))
+
+    def test_upload_stopped_over_limit(self):
+        """Загрузка обрывается со сбросом соединения сразу после лимита"""
+        handler = TinyLimitUploadHandler(RequestFactory().post('/'))
+        handler.new_file('image', 'small.gif', 'image/gif', len(SMALL_GIF))
+        with self.assertRaises(StopUpload) as stopped:
+            handler.receive_data_chunk(SMALL_GIF, 0)
+        self.assertTrue(stopped.exception.connection_reset)
+        self.assertTrue(handler.request.upload_oversized)
+
+    def test_wide_image_downscaled(self):
+        """Слишком широкая картинка уменьшается перед сохранением"""
+        file_obj = BytesIO()
+        Image.new('RGB', (POST_IMAGE_MAX_SIDE * 2, 20)).save(file_obj, 'png')
+        uploaded = SimpleUploadedFile(
+            name='wide.png',
+            content=file_obj.getvalue(),
+            content_type='image/png'
+        )
+        self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Широкая картинка', 'image': uploaded})
+        post = Post.objects.get(text='Широкая картинка')
+        self.assertEqual(post.image.width, POST_IMAGE_MAX_SIDE)
+        self.assertEqual(post.image.height, 10)
@@ -1,9 +1,12 @@
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
 
-from yatube.settings import TITLE_SYMBOL_VIEW
+from yatube.settings import EXCERPT_WORDS, TITLE_SYMBOL_VIEW
 
-from ..models import Group, Post
+from ..counters import reconcile_counters
+from ..models import (AuthorStats, Comment, Follow, Group, Post,
+                      make_excerpt)
 
 User = get_user_model()
 
@@ -47,3 +50,110 @@ class PostModelTest(TestCase):
             with self.subTest(value=value):
                 self.assertEqual(
                     post._meta.get_field(value).verbose_name, expected)
+
+
+class CountersTest(TestCase):
+    """Класс тестирования денормализованных счётчиков"""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Группа',
+            slug='group',
+            description='Тестовое описание',
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая группа',
+            slug='other-group',
+            description='Тестовое описание',
+        )
+
+    def test_counters_follow_changes(self):
+        """Счётчики меняются при создании, переносе и удалении"""
+        post = Post.objects.create(
+            author=self.user, text='Пост', group=self.group)
+        Comment.objects.create(post=post, author=self.user, text='Коммент')
+        self.user.stats.refresh_from_db()
+        self.assertEqual(self.user.stats.posts_count, 1)
+        self.assertEqual(Group.objects.get(pk=self.group.pk).posts_count, 1)
+        self.assertEqual(Post.objects.get(pk=post.pk).comments_count, 1)
+        post = Post.objects.get(pk=post.pk)
+        post.group = self.other_group
+        post.save()
+        self.assertEqual(Group.objects.get(pk=self.group.pk).posts_count, 0)
+        self.assertEqual(
+            Group.objects.get(pk=self.other_group.pk).posts_count, 1)
+        post.delete()
+        self.user.stats.refresh_from_db()
+        self.assertEqual(self.user.stats.posts_count, 0)
+        self.assertEqual(
+            Group.objects.get(pk=self.other_group.pk).posts_count, 0)
+
+    def test_decrement_stops_at_zero(self):
+        """Удаление при разошедшихся нулевых счётчиках не падает"""
+        post = Post.objects.create(
+            author=self.user, text='Пост', group=self.group)
+        Comment.objects.create(post=post, author=self.user, text='Коммент')
+        Post.objects.filter(pk=post.pk).update(comments_count=0)
+        Group.objects.filter(pk=self.group.pk).update(posts_count=0)
+        AuthorStats.objects.filter(user=self.user).update(posts_count=0)
+        post.delete()
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.user).posts_count, 0)
+        self.assertEqual(Group.objects.get(pk=self.group.pk).posts_count, 0)
+
+    def test_user_deleted_with_content(self):
+        """Удаление пользователя с постами и подписками не падает"""
+        user = User.objects.create_user(username='leaving')
+        post = Post.objects.create(author=user, text='Пост', group=self.group)
+        Comment.objects.create(post=post, author=user, text='Коммент')
+        Follow.objects.create(user=user, author=self.user)
+        Follow.objects.create(user=self.user, author=user)
+        user.delete()
+        connection.check_constraints()
+        self.assertFalse(AuthorStats.objects.filter(user_id=user.id).exists())
+        self.assertEqual(Group.objects.get(pk=self.group.pk).posts_count, 0)
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.user).followers_count, 0)
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.user).following_count, 0)
+
+    def test_reconcile_repairs_drift(self):
+        """Сверка чинит рассинхронизированные счётчики"""
+        post = Post.objects.create(
+            author=self.user, text='Пост', group=self.group)
+        Post.objects.filter(pk=post.pk).update(comments_count=5)
+        Group.objects.filter(pk=self.group.pk).update(posts_count=7)
+        AuthorStats.objects.filter(user=self.user).delete()
+        fixed = reconcile_counters()
+        self.assertEqual(fixed, {'authors': 1, 'groups': 1, 'posts': 1})
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.user).posts_count, 1)
+        self.assertEqual(Post.objects.get(pk=post.pk).comments_count, 0)
+        self.assertEqual(Group.objects.get(pk=self.group.pk).posts_count, 1)
+
+
+class ExcerptTest(TestCase):
+    """Класс тестирования сохранённого отрывка поста"""
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+
+    def test_excerpt_follows_text(self):
+        """Отрывок считается при сохранении и обрезается по словам"""
+        words = [f'слово{number}' for number in range(EXCERPT_WORDS + 10)]
+        post = Post.objects.create(author=self.user, text=' '.join(words))
+        self.assertEqual(post.excerpt, make_excerpt(post.text))
+        self.assertTrue(post.excerpt.endswith(f'{words[EXCERPT_WORDS - 1]} …'))
+        post.text = 'Короткий текст'
+        post.save(update_fields=['text'])
+        self.assertEqual(
+            Post.objects.get(pk=post.pk).excerpt, 'Короткий текст')
+
+    def test_feed_defers_text(self):
+        """Ленты не читают полный текст поста"""
+        Post.objects.create(author=self.user, text='Текст')
+        post = Post.objects.for_feed().get()
+        self.assertIn('text', post.get_deferred_fields())
+        self.assertEqual(post.excerpt, 'Текст')
@@ -0,0 +1,103 @@
+import base64
+import warnings
+
+from django.contrib.auth import get_user_model
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+
+from yatube.settings import COUNT_POST_VIEWS
+
+from ..models import Group, Post
+from ..utils import CursorPaginator, get_paginator
+
+User = get_user_model()
+
+
+class CursorPaginatorTests(TestCase):
+    """Класс тестирования курсорной пагинации"""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        for i in range(COUNT_POST_VIEWS + 3):
+            Post.objects.create(
+                author=cls.user,
+                text=f'Тестовый пост {i}',
+                group=cls.group,
+            )
+
+    def test_pages_follow_each_other(self):
+        """Страницы по курсору идут подряд без пропусков и повторов"""
+        paginator = CursorPaginator(Post.objects.all(), COUNT_POST_VIEWS)
+        first_page = paginator.get_page()
+        self.assertFalse(first_page.has_previous())
+        self.assertTrue(first_page.has_next())
+        second_page = paginator.get_page(after=first_page.next_cursor)
+        self.assertEqual(len(second_page), 3)
+        self.assertFalse(second_page.has_next())
+        expected = list(Post.objects.order_by('-pub_date', '-id'))
+        self.assertEqual(list(first_page) + list(second_page), expected)
+        back_page = paginator.get_page(before=second_page.previous_cursor)
+        self.assertEqual(list(back_page), list(first_page))
+        self.assertFalse(back_page.has_previous())
+
+    def test_broken_cursor_returns_first_page(self):
+        """Повреждённый курсор возвращает первую страницу"""
+        paginator = CursorPaginator(Post.objects.all(), COUNT_POST_VIEWS)
+        page = paginator.get_page(after='not-a-cursor')
+        self.assertEqual(list(page), list(paginator.get_page()))
+
+    def test_out_of_range_cursor_returns_first_page(self):
+        """Курсор со значениями вне диапазона базы не ломает запрос"""
+        paginator = CursorPaginator(Post.objects.all(), COUNT_POST_VIEWS)
+        for raw in (f'2020-01-01T00:00:00+00:00|{10 ** 30}',
+                    '9999-12-31T23:00:00-05:00|1'):
+            with self.subTest(raw=raw):
+                cursor = base64.urlsafe_b64encode(raw.encode()).decode()
+                page = paginator.get_page(after=cursor)
+                self.assertEqual(list(page), list(paginator.get_page()))
+
+    def test_naive_cursor_date_treated_as_utc(self):
+        """Дата курсора без часового пояса считается датой в UTC"""
+        paginator = CursorPaginator(Post.objects.all(), COUNT_POST_VIEWS)
+        first_page = paginator.get_page()
+        last = first_page[len(first_page) - 1]
+        raw = f'{last.pub_date.replace(tzinfo=None).isoformat()}|{last.id}'
+        cursor = base64.urlsafe_b64encode(raw.encode()).decode()
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', RuntimeWarning)
+            page = paginator.get_page(after=cursor)
+        self.assertEqual(
+            list(page), list(paginator.get_page(
+                after=first_page.next_cursor)))
+
+    def test_page_mode_breaks_ties_by_id(self):
+        """Постраничный режим сортирует посты с равной датой по id"""
+        Post.objects.update(pub_date=Post.objects.first().pub_date)
+        request = RequestFactory().get('/', {'page': 1})
+        page_obj = get_paginator(
+            Post.objects.order_by('id'), request)['page_obj']
+        ids = [post.id for post in page_obj]
+        self.assertEqual(ids, sorted(ids, reverse=True))
+
+    def test_views_accept_cursor(self):
+        """Ленты переключаются на курсор по параметру after"""
+        cursor = CursorPaginator(
+            Post.objects.all(), COUNT_POST_VIEWS).get_page().next_cursor
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:posts', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url, {'after': cursor})
+                page_obj = response.context['page_obj']
+                self.assertTrue(page_obj.is_cursor)
+                self.assertEqual(len(page_obj), 3)
+                self.assertContains(response, '?before=')
@@ -0,0 +1,57 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+from .utils import MaxQueriesMixin
+
+User = get_user_model()
+
+AUTHORS_COUNT = 5
+
+
+class ViewQueriesTests(MaxQueriesMixin, TestCase):
+    """Число запросов страниц не растёт с числом авторов и комментариев"""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        for i in range(AUTHORS_COUNT):
+            author = User.objects.create_user(
+                username=f'author_{i}', first_name=f'Имя {i}')
+            Follow.objects.create(user=cls.user, author=author)
+            cls.post = Post.objects.create(
+                author=author, text=f'Пост {i}', group=cls.group)
+            Comment.objects.create(
+                post=cls.post, author=author, text=f'Комментарий {i}')
+        for i in range(AUTHORS_COUNT):
+            Comment.objects.create(
+                post=cls.post,
+                author=User.objects.get(username=f'author_{i}'),
+                text=f'Ещё комментарий {i}',
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_views_max_queries(self):
+        """Страницы укладываются в фиксированное число запросов"""
+        pages = {
+            reverse('posts:index'): 4,
+            reverse('posts:posts', kwargs={'slug': self.group.slug}): 5,
+            reverse('posts:profile', kwargs={'username': 'author_0'}): 6,
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}): 4,
+            reverse('posts:follow_index'): 4,
+        }
+        for url, max_queries in pages.items():
+            with self.subTest(url=url):
+                with self.assertMaxQueries(max_queries):
+                    self.authorized_client.get(url)
@@ -0,0 +1,59 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Post, PostSearchTerm
+from ..search import search_posts
+from ..stemmer import stem
+
+User = get_user_model()
+
+
+class SearchTests(TestCase):
+    """Класс тестирования поиска по постам"""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        cls.cats = Post.objects.create(
+            author=cls.user,
+            text='Красивые кошки спят. Кошки любят тепло.',
+        )
+        cls.dogs = Post.objects.create(
+            author=cls.user,
+            text='Собаки и кошка гуляют во дворе',
+        )
+
+    def test_stemmer(self):
+        """Формы одного слова сводятся к одной основе"""
+        self.assertEqual(stem('красивая'), 'красив')
+        self.assertEqual(stem('кошки'), stem('кошкой'))
+        self.assertEqual(stem('ёлка'), stem('елки'))
+
+    def test_search_ranks_by_weight(self):
+        """Найдены все формы слова, чаще упомянутое выше"""
+        self.assertEqual(
+            list(search_posts('кошкам')), [self.cats, self.dogs])
+
+    def test_search_requires_all_words(self):
+        """В выдаче только посты со всеми словами запроса"""
+        self.assertEqual(list(search_posts('кошка собака')), [self.dogs])
+        self.assertFalse(search_posts('и во'))
+
+    def test_index_follows_edit(self):
+        """Индекс обновляется при правке и удалении поста"""
+        post = Post.objects.create(author=self.user, text='Коровы пасутся')
+        post.text = 'Лошади пасутся'
+        post.save()
+        self.assertEqual(list(search_posts('лошадь')), [post])
+        self.assertEqual(list(search_posts('корова')), [])
+        post_id = post.id
+        post.delete()
+        self.assertFalse(
+            PostSearchTerm.objects.filter(post_id=post_id).exists())
+
+    def test_search_page(self):
+        """Страница поиска показывает найденные посты"""
+        response = self.client.get(reverse('posts:search'), {'q': 'собаки'})
+        self.assertEqual(list(response.context['page_obj']), [self.dogs])
+        self.assertContains(response, self.dogs.text)
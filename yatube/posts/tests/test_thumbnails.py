@@ -0,0 +1,52 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TransactionTestCase, override_settings
+from PIL import Image
+
+from .. import thumbnails
+from ..models import Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def make_png():
+    file_obj = BytesIO()
+    Image.new('RGB', (1200, 600), color=(200, 0, 0)).save(file_obj, 'png')
+    return SimpleUploadedFile(
+        name='big.png', content=file_obj.getvalue(), content_type='image/png')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailPipelineTests(TransactionTestCase):
+    """Класс тестирования фоновой генерации миниатюр"""
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_pregenerate_in_background(self):
+        """Миниатюра появляется после фоновой генерации"""
+        user = User.objects.create_user(username='author')
+        post = Post.objects.create(author=user, text='Пост', image=make_png())
+        geometry, options = thumbnails.POST_RENDITIONS[0]
+        self.assertIsNone(thumbnails.get_ready_thumbnail(
+            post.image.name, geometry, **options))
+        thumbnails.pregenerate(post)
+        thumbnails.wait_pending(timeout=30)
+        thumbnail = thumbnails.get_ready_thumbnail(
+            post.image.name, geometry, **options)
+        self.assertIsNotNone(thumbnail)
+        self.assertEqual((thumbnail.width, thumbnail.height), (960, 339))
+
+    def test_placeholder_keeps_geometry(self):
+        """Заглушка отдаёт размеры запрошенной миниатюры"""
+        placeholder = thumbnails.PlaceholderImage('960x339')
+        self.assertEqual((placeholder.width, placeholder.height), (960, 339))
+        self.assertTrue(placeholder.url.endswith('placeholder.svg'))
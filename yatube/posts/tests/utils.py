@@ -0,0 +1,21 @@
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class MaxQueriesMixin:
+    """Проверка верхней границы числа SQL-запросов."""
+
+    @contextmanager
+    def assertMaxQueries(self, number):
+        with CaptureQueriesContext(connection) as context:
+            yield context
+        executed = len(context)
+        queries = '\n'.join(
+            query['sql'] for query in context.captured_queries)
+        self.assertLessEqual(
+            executed, number,
+            f'Выполнено {executed} запросов, ожидалось не больше '
+            f'{number}:\n{queries}'
+        )
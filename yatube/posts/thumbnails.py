@@ -0,0 +1,123 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from django.db import connections
+from django.templatetags.static import static
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.parsers import parse_geometry
+
+from core import perf
+from yatube.settings import THUMBNAIL_PLACEHOLDER, THUMBNAIL_WORKERS
+
+from . import cache
+from .signals import post_scopes
+
+logger = logging.getLogger(__name__)
+
+# Размеры, в которых шаблоны показывают картинки постов
+POST_RENDITIONS = (
+    ('960x339', {'crop': 'center', 'upscale': True}),
+)
+
+_executor = ThreadPoolExecutor(
+    max_workers=THUMBNAIL_WORKERS, thread_name_prefix='thumbnails')
+_pending = {}
+_lock = threading.Lock()
+
+
+class ReadyThumbnailBackend(ThumbnailBackend):
+    """Ищет готовую миниатюру, ничего не генерируя.
+
+    Имя файла строится так же, как в ThumbnailBackend.get_thumbnail,
+    через его внутренние _get_format и _get_thumbnail_filename: у sorl
+    нет публичного способа узнать имя без генерации. Поэтому версия
+    sorl-thumbnail закреплена в requirements.txt, и при её обновлении
+    этот класс надо сверить с get_thumbnail.
+    """
+
+    def get_ready(self, file_, geometry_string, **options):
+        source = ImageFile(file_)
+        if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(sorl_settings, attr)
+            if value != getattr(default_settings, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return default.kvstore.get(ImageFile(name, default.storage))
+
+
+class PlaceholderImage:
+    """Заглушка на месте миниатюры, которая ещё готовится."""
+    is_placeholder = True
+
+    def __init__(self, geometry_string):
+        self.width, self.height = parse_geometry(geometry_string)
+        self.url = static(THUMBNAIL_PLACEHOLDER)
+
+    def __str__(self):
+        return self.url
+
+
+_backend = ReadyThumbnailBackend()
+
+
+def get_ready_thumbnail(file_, geometry_string, **options):
+    """Готовая миниатюра или None, если её ещё нет."""
+    return _backend.get_ready(file_, geometry_string, **options)
+
+
+def _generate(key, name, geometry_string, options, scopes):
+    try:
+        with perf.track('thumbnails:generate'), perf.timer('thumbnail'):
+            get_thumbnail(name, geometry_string, **options)
+        # Страницы с заглушкой закешированы, их пора пересобрать
+        cache.bump(*scopes)
+    except Exception:
+        logger.exception('Не удалось создать миниатюру %s', name)
+        raise
+    finally:
+        with _lock:
+            _pending.pop(key, None)
+        connections.close_all()
+
+
+def schedule(file_, geometry_string, scopes=(), **options):
+    """Ставит миниатюру в очередь пула; повторные заявки склеиваются.
+
+    scopes — области кеша, которые надо сбросить, когда миниатюра готова.
+    """
+    name = getattr(file_, 'name', file_)
+    key = (name, geometry_string, tuple(sorted(options.items())))
+    with _lock:
+        if key in _pending:
+            return _pending[key]
+        future = _executor.submit(
+            _generate, key, name, geometry_string, options, scopes)
+        _pending[key] = future
+    return future
+
+
+def pregenerate(post):
+    """Готовит все размеры картинки поста заранее."""
+    if not post.image:
+        return []
+    scopes = post_scopes(post)
+    return [
+        schedule(post.image.name, geometry, scopes, **options)
+        for geometry, options in POST_RENDITIONS
+    ]
+
+
+def wait_pending(timeout=None):
+    """Дожидается генерации всех заявленных миниатюр."""
+    with _lock:
+        futures = list(_pending.values())
+    wait(futures, timeout=timeout)
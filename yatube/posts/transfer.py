@@ -0,0 +1,334 @@
+"""Потоковые импорт и экспорт групп, постов, комментариев и подписок.
+
+Записи читаются и пишутся по одной, в базу уходят пачками, поэтому
+память не зависит от размера файла. Пользователи и группы указываются
+по username и slug и ищутся в базе один раз на каждое новое значение.
+"""
+import csv
+import json
+import os
+from datetime import datetime
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from . import cache, feed, follows, search
+from .models import Comment, Follow, Group, Post, User, make_excerpt
+
+FORMATS = ('jsonl', 'csv')
+
+# Поле файла -> поле запроса values() при экспорте
+EXPORT_FIELDS = {
+    'posts': {
+        'id': 'id',
+        'author': 'author__username',
+        'group': 'group__slug',
+        'text': 'text',
+        'pub_date': 'pub_date',
+        'image': 'image',
+    },
+    'groups': {
+        'id': 'id',
+        'slug': 'slug',
+        'title': 'title',
+        'description': 'description',
+    },
+    'comments': {
+        'id': 'id',
+        'post': 'post_id',
+        'author': 'author__username',
+        'text': 'text',
+        'created': 'created',
+    },
+    'follows': {
+        'id': 'id',
+        'user': 'user__username',
+        'author': 'author__username',
+    },
+}
+MODELS = {
+    'groups': Group,
+    'posts': Post,
+    'comments': Comment,
+    'follows': Follow,
+}
+DATE_FIELDS = {'posts': 'pub_date', 'comments': 'created'}
+# Уникальные поля, кроме id, по которым запись уже может быть в базе
+NATURAL_KEYS = {'groups': ('slug',), 'follows': ('user_id', 'author_id')}
+
+
+def format_for(path, file_format=None):
+    """Формат из параметра или по расширению файла."""
+    if file_format:
+        return file_format
+    return 'csv' if path.endswith('.csv') else 'jsonl'
+
+
+def read_checkpoint(path):
+    if not path or not os.path.exists(path):
+        return None
+    with open(path) as file:
+        return json.load(file)
+
+
+def write_checkpoint(path, data):
+    """Атомарно сохраняет позицию, чтобы сбой не оставил пустой файл."""
+    temp_path = f'{path}.tmp'
+    with open(temp_path, 'w') as file:
+        json.dump(data, file)
+    os.replace(temp_path, path)
+
+
+class RecordError(ValueError):
+    """Запись нельзя импортировать: нет автора, группы или поля."""
+
+
+def read_records(file, file_format):
+    if file_format == 'csv':
+        yield from csv.DictReader(file)
+        return
+    for line in file:
+        if line.strip():
+            yield json.loads(line)
+
+
+def _isoformat(value):
+    return value.isoformat()
+
+
+class RecordWriter:
+    def __init__(self, file, file_format, fields, header=True):
+        self.file = file
+        self.file_format = file_format
+        if file_format == 'csv':
+            self.writer = csv.DictWriter(file, fieldnames=fields)
+            if header:
+                self.writer.writeheader()
+
+    def write(self, record):
+        if self.file_format == 'csv':
+            self.writer.writerow(record)
+        else:
+            # isoformat, а не DjangoJSONEncoder: тот срезает микросекунды
+            self.file.write(json.dumps(
+                record, ensure_ascii=False, default=_isoformat) + '\n')
+
+
+def export_records(model_name, after_id=0, chunk_size=2000):
+    """Записи модели по возрастанию id, начиная после after_id."""
+    fields = EXPORT_FIELDS[model_name]
+    queryset = MODELS[model_name].objects.filter(id__gt=after_id).order_by(
+        'id').values_list(*fields.values())
+    for row in queryset.iterator(chunk_size=chunk_size):
+        yield dict(zip(fields, row))
+
+
+class Lookup:
+    """Кеш соответствия natural key -> id с дозапросом пачками."""
+
+    def __init__(self, queryset, field, create=None):
+        self.queryset = queryset
+        self.field = field
+        self.create = create
+        self.ids = {}
+
+    def load(self, keys):
+        missing = {key for key in keys if key and key not in self.ids}
+        if not missing:
+            return
+        self.ids.update(self.queryset.filter(
+            **{f'{self.field}__in': missing}).values_list(self.field, 'id'))
+        missing -= self.ids.keys()
+        if missing and self.create:
+            self.create(missing)
+            self.ids.update(self.queryset.filter(
+                **{f'{self.field}__in': missing}).values_list(
+                self.field, 'id'))
+
+    def get(self, key):
+        try:
+            return self.ids[key]
+        except KeyError:
+            raise RecordError(f'не найден {self.field}={key}')
+
+
+def _parse_date(value):
+    if not value:
+        return timezone.now()
+    date = datetime.fromisoformat(value)
+    if timezone.is_naive(date):
+        date = timezone.make_aware(date)
+    return date
+
+
+def _int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _id(record):
+    return int(record['id']) if record.get('id') else None
+
+
+class Importer:
+    """Импорт одной модели пачками с обновлением производных данных.
+
+    bulk_create не шлёт сигналы, поэтому ленты, поисковый индекс и
+    версии кеша обновляются здесь же для каждой пачки, а счётчики
+    сверяются в конце через reconcile_counters. Записи, которые уже
+    есть в базе, не трогаются и считаются в existing.
+    """
+
+    def __init__(self, model_name, dry_run=False, create_users=False):
+        self.model_name = model_name
+        self.dry_run = dry_run
+        create = None
+        if create_users and not dry_run:
+            create = self.create_users
+        self.users = Lookup(User.objects, 'username', create)
+        self.groups = Lookup(Group.objects, 'slug')
+        self.posts = Lookup(Post.objects, 'id')
+        self.skipped = []
+        self.existing = 0
+
+    @staticmethod
+    def create_users(usernames):
+        password = make_password(None)
+        User.objects.bulk_create(
+            [User(username=username, password=password)
+             for username in usernames],
+            ignore_conflicts=True,
+        )
+
+    def build(self, record):
+        if self.model_name == 'posts':
+            return Post(
+                id=_id(record),
+                author_id=self.users.get(record['author']),
+                group_id=(self.groups.get(record['group'])
+                          if record.get('group') else None),
+                text=record['text'],
+                excerpt=make_excerpt(record['text']),
+                pub_date=_parse_date(record.get('pub_date')),
+                image=record.get('image') or '',
+            )
+        if self.model_name == 'groups':
+            return Group(
+                id=_id(record),
+                slug=record['slug'],
+                title=record['title'],
+                description=record.get('description', ''),
+            )
+        if self.model_name == 'comments':
+            return Comment(
+                id=_id(record),
+                post_id=self.posts.get(_int(record['post'])),
+                author_id=self.users.get(record['author']),
+                text=record['text'],
+                created=_parse_date(record.get('created')),
+            )
+        return Follow(
+            id=_id(record),
+            user_id=self.users.get(record['user']),
+            author_id=self.users.get(record['author']),
+        )
+
+    def import_batch(self, records):
+        """Число новых записей пачки, при dry_run — прошедших проверку."""
+        self.users.load(
+            {record.get(key) for record in records.values()
+             for key in ('author', 'user')})
+        self.groups.load(
+            {record.get('group') for record in records.values()})
+        if self.model_name == 'comments':
+            self.posts.load(
+                {_int(record.get('post')) for record in records.values()})
+        objects = []
+        for number, record in records.items():
+            try:
+                objects.append(self.build(record))
+            except (KeyError, ValueError) as error:
+                self.skipped.append((number, str(error)))
+        if self.dry_run or not objects:
+            return len(objects)
+        with transaction.atomic():
+            new_objects = self.new_objects(objects)
+            self.existing += len(objects) - len(new_objects)
+            if new_objects:
+                self.save(new_objects)
+        return len(new_objects)
+
+    def new_objects(self, objects):
+        """Объекты пачки, которых нет в базе, без повторов в пачке."""
+        model = MODELS[self.model_name]
+        taken_ids = set(model.objects.filter(
+            id__in={obj.id for obj in objects if obj.id is not None}
+        ).values_list('id', flat=True))
+        fields = NATURAL_KEYS.get(self.model_name, ())
+        taken_keys = set()
+        if fields:
+            taken_keys = set(model.objects.filter(**{
+                f'{field}__in': {getattr(obj, field) for obj in objects}
+                for field in fields
+            }).values_list(*fields))
+        new_objects = []
+        for obj in objects:
+            key = tuple(getattr(obj, field) for field in fields)
+            if obj.id in taken_ids or (fields and key in taken_keys):
+                continue
+            if obj.id is not None:
+                taken_ids.add(obj.id)
+            taken_keys.add(key)
+            new_objects.append(obj)
+        return new_objects
+
+    def save(self, objects):
+        model = MODELS[self.model_name]
+        if self.model_name == 'groups':
+            Group.objects.bulk_create(objects)
+            cache.bump('groups')
+            return
+        if self.model_name == 'follows':
+            Follow.objects.bulk_create(objects)
+            for follow in objects:
+                feed.backfill_feed(follow.user_id, follow.author_id)
+            scopes = set()
+            for follow in objects:
+                scopes.update(follows.follow_scopes(follow))
+            cache.bump(*scopes)
+            return
+        # auto_now_add затирает дату при вставке, её возвращают отдельно
+        date_field = DATE_FIELDS[self.model_name]
+        dates = [getattr(obj, date_field) for obj in objects]
+        # Записи без id база вставляет как новые и возвращает их id
+        model.objects.bulk_create(objects)
+        for obj, date in zip(objects, dates):
+            setattr(obj, date_field, date)
+        model.objects.bulk_update(objects, [date_field])
+        if self.model_name == 'comments':
+            cache.bump(*{f'post:{comment.post_id}' for comment in objects})
+            return
+        search.index_posts(objects)
+        feed.fan_out_posts(objects)
+        scopes = {'posts'}
+        for post in objects:
+            scopes.add(f'author:{post.author_id}')
+            if post.group_id:
+                scopes.add(f'group:{post.group_id}')
+        cache.bump(*scopes)
+
+
+def batches(records, batch_size, start=0):
+    """Пачки {номер записи: запись}, начиная с записи start."""
+    numbered = enumerate(records)
+    for _ in islice(numbered, start):
+        pass
+    while True:
+        batch = dict(islice(numbered, batch_size))
+        if not batch:
+            return
+        yield batch
@@ -0,0 +1,56 @@
+import os
+from io import BytesIO
+
+from django.core.files.uploadedfile import InMemoryUploadedFile
+from django.core.files.uploadhandler import (StopUpload,
+                                             TemporaryFileUploadHandler)
+from PIL import Image
+
+from yatube.settings import POST_IMAGE_MAX_SIDE, POST_IMAGE_MAX_SIZE
+
+
+class LimitedImageUploadHandler(TemporaryFileUploadHandler):
+    """Пишет загрузку на диск по кускам и обрывает её после лимита.
+
+    Остаток тела запроса не читается: соединение сбрасывается, а запрос
+    помечается флагом upload_oversized, по которому форма сообщает
+    об ошибке.
+    """
+    max_size = POST_IMAGE_MAX_SIZE
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > self.max_size:
+            self.request.upload_oversized = True
+            raise StopUpload(connection_reset=True)
+        return super().receive_data_chunk(raw_data, start)
+
+
+def is_oversized(upload):
+    return upload.size is not None and upload.size > POST_IMAGE_MAX_SIZE
+
+
+def downscale_image(upload, max_side=POST_IMAGE_MAX_SIDE):
+    """Уменьшает картинку больше max_side по длинной стороне.
+
+    thumbnail() сам включает draft() там, где формат это умеет (JPEG),
+    так что большие снимки декодируются сразу в уменьшенном масштабе.
+    Уменьшенная копия невелика и хранится в памяти: временный файл
+    хранилище перенесло бы к себе, и закрыть его потом было бы некому.
+    """
+    upload.seek(0)
+    with Image.open(upload) as image:
+        if max(image.size) <= max_side or getattr(image, 'is_animated', False):
+            upload.seek(0)
+            return upload
+        image_format = image.format
+        image.thumbnail((max_side, max_side))
+        content = BytesIO()
+        image.save(content, format=image_format)
+    return InMemoryUploadedFile(
+        content, upload.field_name, os.path.basename(upload.name),
+        upload.content_type, content.tell(), None)
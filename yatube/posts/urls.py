@@ -1,19 +1,28 @@
 from django.urls import path
 
-from . import views
+from yatube.settings import ASYNC_VIEWS
+
+from . import async_views, views
 
 app_name = 'posts'
 
+# Читающие страницы под ASGI обслуживают асинхронные варианты
+read_views = async_views if ASYNC_VIEWS else views
+
 urlpatterns = [
-    path('', views.index, name='index'),
-    path('group/<slug:slug>/', views.group_posts, name='posts'),
-    path('profile/<str:username>/', views.profile, name='profile'),
-    path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
+    path('', read_views.index, name='index'),
+    path('group/<slug:slug>/', read_views.group_posts, name='posts'),
+    path('profile/<str:username>/', read_views.profile, name='profile'),
+    path('posts/<int:post_id>/', read_views.post_detail,
+         name='post_detail'),
     path('create/', views.post_create, name='post_create',),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
     path('posts/<int:post_id>/comment/',
          views.add_comment, name='add_comment'),
-    path('follow/', views.follow_index, name='follow_index'),
+    path('posts/<int:post_id>/comments/',
+         views.post_comments, name='post_comments'),
+    path('search/', views.search, name='search'),
+    path('follow/', read_views.follow_index, name='follow_index'),
     path(
         'profile/<str:username>/follow/',
         views.profile_follow,
@@ -1,10 +1,161 @@
+import base64
+import binascii
+from collections.abc import Sequence
+from datetime import datetime, timezone
+
 from django.core.paginator import Paginator
+from django.db.models import Q
+
+from yatube.settings import (COMMENTS_PER_PAGE, COUNT_POST_VIEWS,
+                             PAGINATOR_MODE)
+
+from .models import Comment
+
+FEED_ORDERING = ('-pub_date', '-id')
+COMMENT_ORDERING = ('created', 'id')
+# Наибольший id, который SQLite хранит в INTEGER
+MAX_KEY = 2 ** 63 - 1
+
+
+class CursorPage(Sequence):
+    """Страница курсорной пагинации с интерфейсом, похожим на Page."""
+    is_cursor = True
+    number = None
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return f'<CursorPage: {len(self)} objects>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next and bool(self.object_list)
+
+    def has_previous(self):
+        return self._has_previous and bool(self.object_list)
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
 
-from yatube.settings import COUNT_POST_VIEWS
+    @property
+    def next_cursor(self):
+        if self.has_next():
+            return self.paginator.encode_cursor(self.object_list[-1])
+        return None
 
+    @property
+    def previous_cursor(self):
+        if self.has_previous():
+            return self.paginator.encode_cursor(self.object_list[0])
+        return None
 
-def get_paginator(queryset, request):
-    paginator = Paginator(queryset, COUNT_POST_VIEWS)
+
+class CursorPaginator:
+    """Пагинация по ключу (дата, id) без COUNT(*) и OFFSET.
+
+    Курсор — непрозрачная строка, закодированная в base64, из значений
+    полей сортировки крайней записи страницы. Время выборки любой страницы
+    не зависит от её глубины и размера таблицы.
+    """
+
+    def __init__(self, queryset, per_page, ordering=FEED_ORDERING):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.ordering = ordering
+        self.fields = [field.lstrip('-') for field in ordering]
+        self.descending = ordering[0].startswith('-')
+
+    def encode_cursor(self, obj):
+        """Курсор записи: объекта модели или словаря из values()."""
+        if isinstance(obj, dict):
+            date_value, key_value = (obj[field] for field in self.fields)
+        else:
+            date_value, key_value = (
+                getattr(obj, field) for field in self.fields)
+        raw = f'{date_value.isoformat()}|{key_value}'
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        """Возвращает (дата, id) или None для повреждённого курсора.
+
+        Значения вне диапазона базы тоже считаются повреждением: иначе
+        SQLite ответил бы на запрос страницы OverflowError.
+        """
+        if not cursor:
+            return None
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            raw = base64.urlsafe_b64decode(padded.encode()).decode()
+            date_value, key_value = raw.split('|')
+            date_value = datetime.fromisoformat(date_value)
+            # Даты в базе хранятся в UTC; дата без пояса считается UTC
+            if date_value.tzinfo is None:
+                date_value = date_value.replace(tzinfo=timezone.utc)
+            else:
+                date_value = date_value.astimezone(timezone.utc)
+            key_value = int(key_value)
+        except (binascii.Error, UnicodeDecodeError, ValueError,
+                OverflowError):
+            return None
+        if not -MAX_KEY <= key_value <= MAX_KEY:
+            return None
+        return date_value, key_value
+
+    def _keyset_filter(self, cursor, forward):
+        date_field, key_field = self.fields
+        date_value, key_value = cursor
+        lookup = 'lt' if self.descending == forward else 'gt'
+        return (
+            Q(**{f'{date_field}__{lookup}': date_value})
+            | Q(**{date_field: date_value,
+                   f'{key_field}__{lookup}': key_value})
+        )
+
+    def page_queryset(self, cursor=None, forward=True):
+        """Запрос страницы с одной лишней записью для has_next."""
+        queryset = self.queryset.order_by(*self.ordering)
+        if cursor is not None:
+            queryset = queryset.filter(self._keyset_filter(cursor, forward))
+        if not forward:
+            queryset = queryset.reverse()
+        return queryset[:self.per_page + 1]
+
+    def get_page(self, after=None, before=None):
+        cursor = self.decode_cursor(before)
+        forward = cursor is None
+        if forward:
+            cursor = self.decode_cursor(after)
+        object_list = list(self.page_queryset(cursor, forward))
+        has_more = len(object_list) > self.per_page
+        object_list = object_list[:self.per_page]
+        if forward:
+            return CursorPage(object_list, self, has_more, cursor is not None)
+        object_list.reverse()
+        return CursorPage(object_list, self, True, has_more)
+
+
+def get_paginator(queryset, request, ordering=FEED_ORDERING):
+    after = request.GET.get('after')
+    before = request.GET.get('before')
+    if PAGINATOR_MODE == 'cursor' or after or before:
+        paginator = CursorPaginator(queryset, COUNT_POST_VIEWS, ordering)
+        return {
+            'paginator': paginator,
+            'page_number': None,
+            'page_obj': paginator.get_page(after=after, before=before),
+        }
+    # Тот же порядок, что и у курсора: при равных датах страницы
+    # не теряют и не повторяют записи
+    paginator = Paginator(queryset.order_by(*ordering), COUNT_POST_VIEWS)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     return {
@@ -12,3 +163,11 @@ def get_paginator(queryset, request):
         'page_number': page_number,
         'page_obj': page_obj,
     }
+
+
+def get_comments_page(post_id, after=None):
+    """Страница комментариев поста по курсору, авторы — в том же запросе."""
+    paginator = CursorPaginator(
+        Comment.objects.filter(post_id=post_id).select_related('author'),
+        COMMENTS_PER_PAGE, COMMENT_ORDERING)
+    return paginator.get_page(after=after)
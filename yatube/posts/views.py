@@ -1,56 +1,144 @@
+from urllib.parse import urlencode
+
 from django.contrib.auth.decorators import login_required
-from django.http import HttpResponseRedirect
+from django.core.paginator import Paginator
+from django.http import (Http404, HttpResponse, HttpResponseRedirect,
+                         JsonResponse)
 from django.shortcuts import get_object_or_404, redirect, render
+from django.template.loader import render_to_string
+
+from core.db import read_replica
+from yatube.settings import COUNT_POST_VIEWS, THUMBNAIL_ASYNC
 
+from .cache import (anonymous_page_cache, conditional_page,
+                    feed_cache_context)
+from .comments import submit_comment
+from .counters import author_follow_counts, author_posts_count
+from .feed import TIMELINE_ORDERING, get_feed
+from .follows import is_following, suggested_authors
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
-from .utils import get_paginator
+from .groups import get_group
+from .models import Follow, Post, User
+from .search import search_posts
+from .tasks import schedule_thumbnails
+from .utils import get_comments_page, get_paginator
 
 # TODO сделать рефакторниг проекта
 
 
+def page_object(request, queryset, **lookup):
+    """Объект страницы, загруженный один раз за запрос.
+
+    Его читают и области для ETag, и само представление, поэтому
+    условный GET не добавляет запросов к базе.
+    """
+    if not hasattr(request, '_page_object'):
+        found = list(queryset.filter(**lookup)[:1])
+        request._page_object = found[0] if found else None
+    return request._page_object
+
+
+def page_object_or_404(request, queryset, **lookup):
+    obj = page_object(request, queryset, **lookup)
+    if obj is None:
+        raise Http404
+    return obj
+
+
+def index_page_scopes(request):
+    return ('posts', 'groups')
+
+
+def group_page_scopes(request, slug):
+    group = get_group(slug)
+    return None if group is None else (f'group:{group.id}',)
+
+
+def profile_page_scopes(request, username):
+    author = page_object(
+        request, User.objects.select_related('stats'), username=username)
+    if author is None:
+        return None
+    scopes = (f'author:{author.id}', f'follow_counts:{author.id}', 'groups')
+    if request.user.is_authenticated:
+        # Кнопка подписки зависит от подписок зрителя
+        scopes += (f'follow:{request.user.pk}',)
+    return scopes
+
+
+def post_page_scopes(request, post_id):
+    post = page_object(request, Post.objects.for_detail(), pk=post_id)
+    if post is None:
+        return None
+    return (f'post:{post.id}', f'author:{post.author_id}', 'groups')
+
+
+def comments_page_scopes(request, post_id):
+    return (f'post:{post_id}',)
+
+
+@read_replica
+@conditional_page(index_page_scopes)
+@anonymous_page_cache(index_page_scopes)
 def index(request):
-    post_list = Post.objects.select_related('group').all().order_by(
-        '-pub_date')
+    post_list = Post.objects.for_feed().order_by('-pub_date')
     index_active = True
     context = {
         'index': index_active,
     }
     context.update(get_paginator(post_list, request))
+    context.update(feed_cache_context(
+        request, context['page_obj'], 'posts', 'groups'))
     return render(request, 'posts/index.html', context)
 
 
+@read_replica
+@conditional_page(group_page_scopes)
+@anonymous_page_cache(group_page_scopes)
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
-    group_list = Post.objects.filter(group=group).order_by('-pub_date')
+    group = get_group(slug)
+    if group is None:
+        raise Http404
+    group_list = Post.objects.for_feed().filter(group_id=group.id).order_by(
+        '-pub_date')
     context = {
         'group': group,
     }
     context.update(get_paginator(group_list, request))
+    context.update(feed_cache_context(
+        request, context['page_obj'], f'group:{group.id}'))
     return render(request, 'posts/group_list.html', context)
 
 
+@read_replica
+@conditional_page(profile_page_scopes)
+@anonymous_page_cache(profile_page_scopes)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    posts_list = Post.objects.select_related('author', 'group').filter(
-        author=author).order_by('-pub_date')
-    author_posts_count = posts_list.count()
-    following = (request.user.is_authenticated and (Follow.objects.filter(
-        user=request.user, author=author).exists())
-    )
+    author = page_object_or_404(
+        request, User.objects.select_related('stats'), username=username)
+    posts_list = Post.objects.for_feed().filter(author=author).order_by(
+        '-pub_date')
+    followers_count, following_count = author_follow_counts(author)
     context = {
         'author': author,
-        'author_posts_count': author_posts_count,
-        'following': following,
+        'author_posts_count': author_posts_count(author),
+        'author_followers_count': followers_count,
+        'author_following_count': following_count,
+        'following': is_following(request.user, [author.id])[author.id],
     }
     context.update(get_paginator(posts_list, request))
+    context.update(feed_cache_context(
+        request, context['page_obj'], f'author:{author.id}', 'groups'))
     return render(request, 'posts/profile.html', context)
 
 
+@read_replica
+@conditional_page(post_page_scopes)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
-    author_posts = post.author.posts.count()
-    comments = post.comments.all()
+    post = page_object_or_404(
+        request, Post.objects.for_detail(), pk=post_id)
+    author_posts = author_posts_count(post.author)
+    comments = get_comments_page(post.id, request.GET.get('after'))
     form = CommentForm()
     context = {
         'post': post,
@@ -61,16 +149,50 @@ def post_detail(request, post_id):
     return render(request, 'posts/post_detail.html', context)
 
 
+@read_replica
+@conditional_page(comments_page_scopes)
+def post_comments(request, post_id):
+    """Следующая страница комментариев для «Показать ещё».
+
+    Отдаёт HTML-фрагмент, а с ?format=json — его же вместе с курсором
+    следующей страницы.
+    """
+    if not Post.objects.filter(pk=post_id).exists():
+        raise Http404
+    comments = get_comments_page(post_id, request.GET.get('after'))
+    html = render_to_string(
+        'posts/includes/comments.html',
+        {'post_id': post_id, 'comments': comments}, request)
+    if request.GET.get('format') == 'json':
+        return JsonResponse({'html': html, 'next': comments.next_cursor})
+    return HttpResponse(html)
+
+
+@read_replica
+def search(request):
+    query = request.GET.get('q', '').strip()
+    paginator = Paginator(search_posts(query), COUNT_POST_VIEWS)
+    context = {
+        'query': query,
+        'paginator_query': urlencode({'q': query}) + '&',
+        'page_obj': paginator.get_page(request.GET.get('page')),
+    }
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
 def post_create(request):
     form = PostForm(
         request.POST or None,
-        files=request.FILES or None
+        files=request.FILES or None,
+        upload_oversized=getattr(request, 'upload_oversized', False)
     )
     if form.is_valid():
         post = form.save(commit=False)
         post.author = request.user
         post.save()
+        if post.image and THUMBNAIL_ASYNC:
+            schedule_thumbnails(post)
         return redirect('posts:profile', request.user.username)
     return render(request, 'posts/create_post.html', {'form': form})
 
@@ -82,12 +204,16 @@ def post_edit(request, post_id):
     form = PostForm(
         request.POST or None,
         files=request.FILES or None,
-        instance=post
+        instance=post,
+        upload_oversized=getattr(request, 'upload_oversized', False)
     )
     if request.user != post.author:
         return redirect('posts:post_detail', post.id)
     if request.user == post.author and form.is_valid():
         form.save()
+        if (THUMBNAIL_ASYNC and 'image' in form.changed_data
+                and post.image):
+            schedule_thumbnails(post)
         return redirect('posts:post_detail', post.id)
     context = {
         'form': form,
@@ -98,28 +224,36 @@ def post_edit(request, post_id):
 
 @login_required
 def add_comment(request, post_id):
-    post = Post.objects.get(id=post_id)
+    # Сам пост не нужен: комментарий ссылается на него по id
+    if not Post.objects.filter(pk=post_id).exists():
+        raise Http404
     form = CommentForm(request.POST or None)
     if form.is_valid():
         comment = form.save(commit=False)
         comment.author = request.user
-        comment.post = post
-        comment.save()
+        comment.post_id = post_id
+        submit_comment(comment)
     return redirect('posts:post_detail', post_id=post_id)
 
 
 @login_required
+@read_replica
 def follow_index(request):
     user = request.user
-    posts_list = Post.objects.filter(author__following__user=user)
-    post_count = posts_list.count()
+    posts_list = get_feed(user)
     follow_active = True
     context = {
         'user': user,
-        'post_count': post_count,
         'follow': follow_active,
     }
-    context.update(get_paginator(posts_list, request))
+    context.update(get_paginator(posts_list, request, TIMELINE_ORDERING))
+    if not context['page_obj']:
+        # Рекомендации нужны тому, чья лента пуста, остальным они
+        # стоили бы лишнего запроса на каждой странице
+        context['suggestions'] = suggested_authors(user)
+    context.update(feed_cache_context(
+        request, context['page_obj'], f'follow:{user.id}', 'posts', 'groups',
+        per_user=True))
     return render(request, 'posts/follow.html', context)
 
 
@@ -0,0 +1,18 @@
+// «Показать ещё» подгружает следующую страницу комментариев на месте,
+// без JavaScript ссылка просто открывает её вместе с постом
+document.addEventListener('click', (event) => {
+  const link = event.target.closest('[data-load-more]');
+  if (!link) {
+    return;
+  }
+  event.preventDefault();
+  fetch(link.dataset.loadMore)
+    .then((response) => response.json())
+    .then((data) => {
+      link.insertAdjacentHTML('beforebegin', data.html);
+      link.remove();
+    })
+    .catch(() => {
+      window.location = link.href;
+    });
+});
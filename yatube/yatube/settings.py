@@ -37,7 +37,26 @@ DEFAULT_AUTO_FIELD = 'django.db.models.AutoField'
 
 # Count post views
 COUNT_POST_VIEWS = 10
+# Комментариев на странице поста и в каждой подгрузке «Показать ещё»
+COMMENTS_PER_PAGE = 20
+# Режим пагинации лент: 'page' (номера страниц) или 'cursor' (по ключу)
+PAGINATOR_MODE = 'page'
+# JSON API: записей на странице по умолчанию и наибольшее по параметру limit
+API_PAGE_SIZE = 20
+API_MAX_PAGE_SIZE = 100
 TITLE_SYMBOL_VIEW = 15
+# Сколько слов текста поста хранить в отрывке для лент
+EXCERPT_WORDS = 50
+# Лента подписок: сколько постов автора добавлять при подписке
+# и размер пачки при раскладке поста по лентам подписчиков
+FEED_BACKFILL_SIZE = 1000
+FEED_BATCH_SIZE = 1000
+# Подписки: сколько рекомендаций «кого почитать» хранить и показывать
+# и по скольким последним подпискам пользователя искать кандидатов
+FOLLOW_SUGGESTIONS = 5
+FOLLOW_SUGGESTIONS_SAMPLE = 200
+# Поиск: размер пачки записей при построении индекса
+SEARCH_BATCH_SIZE = 1000
 # Login settings
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
@@ -47,13 +66,89 @@ LOGIN_REDIRECT_URL = 'posts:index'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Загрузка картинок постов: лимит размера файла, длинная сторона,
+# больше которой картинка уменьшается, и предел числа пикселей
+POST_IMAGE_MAX_SIZE = 5 * 1024 * 1024
+POST_IMAGE_MAX_SIDE = 2560
+POST_IMAGE_MAX_PIXELS = 50_000_000
+FILE_UPLOAD_HANDLERS = [
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'posts.uploads.LimitedImageUploadHandler',
+]
+
+# Миниатюры картинок: фоновая генерация и заглушка до её окончания.
+# Модули читают флаг из этого файла, поэтому профиль settings_prod
+# включает его через YATUBE_THUMBNAIL_ASYNC до импорта настроек.
+THUMBNAIL_ASYNC = os.environ.get(
+    'YATUBE_THUMBNAIL_ASYNC', '0' if DEBUG else '1') == '1'
+THUMBNAIL_WORKERS = 2
+THUMBNAIL_PLACEHOLDER = 'img/placeholder.svg'
+
+# Буфер записи комментариев: пачка до COMMENT_BUFFER_SIZE штук уходит
+# в базу одной транзакцией не позже чем через COMMENT_BUFFER_LATENCY секунд.
+# Без буфера комментарий виден сразу после отправки
+COMMENT_BUFFER_ENABLED = False
+COMMENT_BUFFER_SIZE = 100
+COMMENT_BUFFER_LATENCY = 0.2
+
+# Фоновые задачи (приложение jobs). В режиме JOBS_EAGER они выполняются
+# сразу в запросе; без него их выполняют воркеры run_workers, беря
+# задачи в аренду на JOBS_LEASE_TIMEOUT секунд. Неудачная задача
+# повторяется с паузой от JOBS_RETRY_BACKOFF секунд, удваивающейся
+# до JOBS_RETRY_BACKOFF_MAX, но не больше JOBS_MAX_ATTEMPTS раз.
+# Воркеры инвалидируют страницы в кеше, поэтому без JOBS_EAGER нужен общий
+# кеш YATUBE_CACHE_BACKEND=sqlite: с кешем в памяти процесса проверка
+# jobs.E001 не даст запустить ни сайт, ни run_workers
+JOBS_EAGER = os.environ.get('YATUBE_JOBS_EAGER', '1') == '1'
+JOBS_LEASE_TIMEOUT = 5 * 60
+JOBS_MAX_ATTEMPTS = 5
+JOBS_RETRY_BACKOFF = 10
+JOBS_RETRY_BACKOFF_MAX = 60 * 60
+JOBS_BATCH_SIZE = 10
+JOBS_POLL_INTERVAL = 1
+JOBS_KEEP_DONE_DAYS = 7
+
 # Настройки кеширования
+# Время жизни фрагментов лент; актуальность держится версиями ключей
+FEED_CACHE_TIMEOUT = 60 * 60
+# Отрисованные карточки постов; устаревшие отсекает версия поста в ключе
+POST_CARD_CACHE_TIMEOUT = 24 * 60 * 60
+# Реестр групп: группы по slug и варианты выбора группы в форме поста
+GROUPS_CACHE_TIMEOUT = 24 * 60 * 60
+# Списки id авторов, на которых подписан пользователь
+FOLLOWING_CACHE_TIMEOUT = 24 * 60 * 60
+# Кеш целых страниц для гостей: срок свежести, сколько ещё можно отдавать
+# устаревшую копию, пока её пересобирают, блокировка пересборки, ожидание
+# чужой пересборки без копии и коэффициент раннего обновления XFetch
+PAGE_CACHE_TIMEOUT = 60
+PAGE_CACHE_STALE_TIMEOUT = 10 * 60
+PAGE_CACHE_LOCK_TIMEOUT = 10
+PAGE_CACHE_LOCK_WAIT = 2
+PAGE_CACHE_XFETCH_BETA = 1.0
+# Бэкенд выбирается переменной окружения YATUBE_CACHE_BACKEND:
+# locmem — в памяти процесса, sqlite — общий файл для всех процессов
+CACHE_BACKENDS = {
+    'locmem': 'core.cache.LocMemCache',
+    'sqlite': 'core.cache.SQLiteCache',
+}
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': CACHE_BACKENDS[
+            os.environ.get('YATUBE_CACHE_BACKEND', 'locmem')],
+        'LOCATION': os.environ.get(
+            'YATUBE_CACHE_LOCATION', os.path.join(BASE_DIR, 'cache.sqlite3')),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(
+                os.environ.get('YATUBE_CACHE_MAX_ENTRIES', 100_000)),
+            'MAX_SIZE': int(
+                os.environ.get('YATUBE_CACHE_MAX_SIZE', 64 * 1024 * 1024)),
+        },
     }
 }
 
+# Метрики производительности запросов (страница /admin/perf/)
+PERF_ENABLED = True
+
 # Application definition
 
 INSTALLED_APPS = [
@@ -67,10 +162,13 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
+    'jobs.apps.JobsConfig',
     'sorl.thumbnail',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.PerfMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -86,7 +184,7 @@ TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.templates.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -102,6 +200,10 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
+ASGI_APPLICATION = 'yatube.asgi.application'
+# Асинхронные варианты читающих страниц (posts.async_views); yatube/asgi.py
+# включает их по умолчанию, под WSGI они только заняли бы лишний поток
+ASYNC_VIEWS = os.environ.get('YATUBE_ASYNC_VIEWS', '0') == '1'
 
 
 # Database
@@ -113,6 +215,10 @@ DATABASES = {
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
     }
 }
+# PRAGMA для каждого нового соединения SQLite (см. core.db)
+SQLITE_PRAGMAS = {}
+# Псевдоним базы, на которую core.db.ReadReplicaRouter шлёт чтения лент
+READ_REPLICA = None
 
 
 # Password validation
@@ -0,0 +1,69 @@
+"""Профиль для боевого сервера: DJANGO_SETTINGS_MODULE=yatube.settings_prod.
+
+Соединения с базой живут между запросами, SQLite работает в режиме
+WAL, чтобы запись комментариев и постов не блокировала чтение, а ленты
+читаются через отдельное соединение только для чтения. Шаблоны
+разбираются один раз на процесс.
+"""
+import os
+
+# Флаги, которые модули импортируют из yatube.settings напрямую,
+# задаются до загрузки базовых настроек
+os.environ.setdefault('YATUBE_THUMBNAIL_ASYNC', '1')
+
+from .settings import *  # noqa: E402,F401,F403
+from .settings import BASE_DIR, DATABASES, TEMPLATES  # noqa: E402
+
+DEBUG = False
+THUMBNAIL_ASYNC = True
+
+DATABASE_PATH = os.environ.get(
+    'YATUBE_DB_PATH', os.path.join(BASE_DIR, 'db.sqlite3'))
+DATABASES = {
+    'default': {
+        **DATABASES['default'],
+        'NAME': DATABASE_PATH,
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        # Ожидание блокировки на стороне драйвера, секунды
+        'OPTIONS': {'timeout': 5},
+    },
+}
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    # Отрицательное значение — размер в КиБ, здесь 64 МиБ
+    'cache_size': -64 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+# Реплика для чтения лент. По умолчанию тот же файл, открытый только
+# на чтение: с WAL читатели не ждут писателей. Путь к настоящей
+# реплике задаётся YATUBE_REPLICA_DB_PATH, пустое значение отключает её.
+REPLICA_PATH = os.environ.get('YATUBE_REPLICA_DB_PATH', DATABASE_PATH)
+if REPLICA_PATH:
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': f'file:{REPLICA_PATH}?mode=ro',
+        'TEST': {'MIRROR': 'default'},
+    }
+    READ_REPLICA = 'replica'
+    DATABASE_ROUTERS = ['core.db.ReadReplicaRouter']
+
+# Скомпилированные шаблоны хранятся в памяти процесса; правки файлов
+# подхватываются только после перезапуска
+TEMPLATES = [{
+    **TEMPLATES[0],
+    'APP_DIRS': False,
+    'OPTIONS': {
+        **TEMPLATES[0]['OPTIONS'],
+        'loaders': [
+            ('django.template.loaders.cached.Loader', [
+                'django.template.loaders.filesystem.Loader',
+                'django.template.loaders.app_directories.Loader',
+            ]),
+        ],
+    },
+}]